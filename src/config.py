@@ -40,6 +40,11 @@ class VectorDBConfig:
     SIMILARITY_THRESHOLD = 0.01  # Very low threshold to capture more results (was 0.05, actual scores: 0.05-0.23)
     MAX_RESULTS = 100  # Increased for better coverage of legal concepts
     MAX_DOCS = 4  # Maximum number of documents to process for final response
+    
+    # Ingest batching: add_documents buffers chunks and writes them to ChromaDB in
+    # batches so the embedding model encodes many texts per call
+    ADD_BATCH_SIZE = 256  # Chunks per collection.add call
+    ADD_FLUSH_INTERVAL = 5.0  # Seconds since the last write after which the next add also writes a partial batch (checked per add, no timer)
 
 
 class LLMConfig:
@@ -101,6 +106,42 @@ class SystemConfig:
     SHOW_PROGRESS_EVERY_N_BATCHES = 10  # Show progress every N batches (reduce logging overhead)
 
 
+class WhatsAppConfig:
+    """Configuration for the WhatsApp legal service"""
+    
+    # Conversation history
+    HISTORY_CACHE_SIZE = 2048  # Users whose chat history is kept in memory (LRU)
+    HISTORY_MAX_MESSAGES = 40  # Most recent messages kept per user
+    
+    # Semantic query cache: near-duplicate questions reuse a previous answer
+    SEMANTIC_CACHE_SIZE = 512  # Cached queries (LRU)
+    SEMANTIC_CACHE_THRESHOLD = 0.93  # Minimum cosine similarity for a cache hit
+    EMBED_BATCH_SIZE = 32  # Max queries embedded together for cache lookups
+    EMBED_BATCH_WINDOW = 0.05  # Seconds to collect concurrent queries into one batch
+    RETRIEVAL_BATCH_SIZE = 16  # Max queries sent to ChromaDB in one collection.query
+    RETRIEVAL_BATCH_WINDOW = 0.01  # Seconds to collect concurrent searches into one batch
+    
+    # Start English research while language detection is still running; the
+    # speculative run is cancelled when the query turns out not to be English
+    SPECULATIVE_ENGLISH_RESEARCH = False
+    
+    # Exact-match cache of Gemini translations
+    TRANSLATION_CACHE_SIZE = 4096  # Cached translations (LRU)
+    TRANSLATION_CACHE_TTL = 86400  # Seconds before a cached translation expires
+    
+    # Cache of Gemini language detection results per message text
+    LANGUAGE_CACHE_SIZE = 4096  # Cached detections (LRU)
+    LANGUAGE_CACHE_TTL = 3600  # Seconds before a cached detection expires
+    # Treat pure-ASCII messages as English without asking Gemini. Saves a
+    # round trip for most messages; Latin-script requests such as
+    # "answer in Urdu" are then answered in English
+    ASCII_IS_ENGLISH = True
+    
+    # Max concurrent Gemini detection/translation calls; bursts queue instead
+    # of tripping rate limits
+    GEMINI_MAX_CONCURRENCY = 4
+
+
 # Convenience functions to get configurations
 def get_chunking_config() -> ChunkingConfig:
     """Get chunking configuration"""
@@ -118,6 +159,10 @@ def get_system_config() -> SystemConfig:
     """Get system configuration"""
     return SystemConfig()
 
+def get_whatsapp_config() -> WhatsAppConfig:
+    """Get WhatsApp service configuration"""
+    return WhatsAppConfig()
+
 
 # Example usage and testing
 if __name__ == "__main__":
@@ -22,7 +22,7 @@ logger = logging.getLogger(__name__)
 
 # Import our existing backend components
 from flow import create_offline_indexing_flow, create_online_research_flow
-from utils.progress import get_progress_tracker
+from utils.progress import get_progress_tracker_pool, set_progress_tracker
 from config import get_system_config, get_vector_db_config, get_llm_config
 from utils.vector_db import create_vector_db
 from utils.call_llm import set_llm_config, reset_usage_tracking, get_usage_and_cost
@@ -248,8 +248,13 @@ def sync_broadcast_progress(session_id: str, progress_data: Dict):
         return await broadcast_progress(session_id, progress_data)
     
     try:
-        # Try to get current event loop
-        loop = asyncio.get_running_loop()
+        # Progress callbacks are usually delivered from the tracker's forwarder
+        # thread, which has no event loop of its own
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            asyncio.run(do_broadcast())
+            return
         
         # Run in thread to avoid "already running" error
         with concurrent.futures.ThreadPoolExecutor() as executor:
@@ -468,6 +473,11 @@ async def start_research(query: ResearchQuery, background_tasks: BackgroundTasks
     logger.info(f"Session {session_id} stored in active_sessions. Total sessions: {len(active_sessions)}")
     
     async def run_research():
+        # Each research task uses its own pooled tracker, so concurrent sessions
+        # don't overwrite each other's progress; it is returned to the pool when done
+        tracker_pool = get_progress_tracker_pool()
+        tracker = tracker_pool.acquire()
+        set_progress_tracker(tracker)
         try:
             logger.info(f"[{session_id}] STEP 1: Starting run_research() background task")
             
@@ -484,7 +494,6 @@ async def start_research(query: ResearchQuery, background_tasks: BackgroundTasks
             
             # Setup progress tracking
             logger.info(f"[{session_id}] STEP 4: Getting progress tracker instance")
-            tracker = get_progress_tracker()
             start_time = datetime.now()
             logger.info(f"[{session_id}] ✓ Progress tracker obtained, start time: {start_time.isoformat()}")
             
@@ -582,9 +591,7 @@ async def start_research(query: ResearchQuery, background_tasks: BackgroundTasks
                             relevant_chunks = progress_data.get('document_relevant_chunks', {}).get(doc_name, 0)
                             
                             # Get actual processing time from progress tracker
-                            document_processing_times = progress_data.get('document_processing_times', {})
-                            doc_timing = document_processing_times.get(doc_name, {})
-                            processing_time = doc_timing.get('duration', 0) if actual_status == "completed" else 0
+                            processing_time = tracker.get_document_processing_time(doc_name) if actual_status == "completed" else 0
                             
                             documents_being_read.append({
                                 "name": display_name,
@@ -605,7 +612,7 @@ async def start_research(query: ResearchQuery, background_tasks: BackgroundTasks
                         "documentsBeingRead": documents_being_read,
                         "completedReadings": progress_data.get('completed_readings', 0),
                         "totalReadings": progress_data.get('total_readings', 0),
-                        "stageDurations": progress_data.get('stage_durations', {}),
+                        "stageDurations": tracker.get_stage_durations(),
                         "stageElapsedTime": progress_data.get('stage_elapsed_time', 0)
                     }
                 
@@ -835,6 +842,8 @@ async def start_research(query: ResearchQuery, background_tasks: BackgroundTasks
             
             await broadcast_progress(session_id, error_data)
             logger.info(f"[{session_id}] Error notification sent")
+        finally:
+            tracker_pool.release(tracker)
     
     logger.info(f"[{session_id}] Scheduling run_research() as background task")
     background_tasks.add_task(run_research)
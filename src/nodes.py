@@ -177,6 +177,9 @@ class VectorIndexCreationNode(BatchNode):
                            f"{len(batch_chunks):,} chunks in {batch_time:.1f}s "
                            f"({chunks_per_sec:.0f} chunks/s) - ETA: {eta/60:.1f} min")
         
+        # Write any chunks still buffered by the vector database
+        vector_db.flush()
+        
         total_time = time.time() - start_time
         logger.info("="*80)
         logger.info(f"✓ INDEXING COMPLETE!")
@@ -251,13 +254,17 @@ class InitialRetrievalNode(Node):
         except Exception as e:
             logger.error(f"❌ Error checking ChromaDB collection: {e}")
         
-        logger.info("Executing vector similarity search...")
-        
-        retrieved_chunks = vector_db.search(
-            query=user_query,
-            n_results=vdb_config.MAX_RESULTS,
-            similarity_threshold=vdb_config.SIMILARITY_THRESHOLD
-        )
+        # Callers that batch searches across requests pass the results in
+        retrieved_chunks = shared.get("prefetched_chunks")
+        if retrieved_chunks is None:
+            logger.info("Executing vector similarity search...")
+            retrieved_chunks = vector_db.search(
+                query=user_query,
+                n_results=vdb_config.MAX_RESULTS,
+                similarity_threshold=vdb_config.SIMILARITY_THRESHOLD
+            )
+        else:
+            logger.info("Using chunks from batched vector search")
         
         logger.info(f"✅ Retrieved {len(retrieved_chunks)} chunks from ChromaDB")
         
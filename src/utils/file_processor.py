@@ -132,6 +132,8 @@ class LegalFileProcessor:
             Dictionary with file information, metadata, and content
         """
         try:
+            # Single stat up front; file_size is the on-disk size in bytes
+            st = os.stat(file_path)
             with open(file_path, 'r', encoding='utf-8') as f:
                 full_text = f.read()
             
@@ -141,7 +143,7 @@ class LegalFileProcessor:
             file_info = {
                 'file_path': file_path,
                 'file_name': os.path.basename(file_path),
-                'file_size': len(full_text),
+                'file_size': st.st_size,
                 'content_length': len(content),
                 'metadata': metadata,
                 'content': content,
@@ -0,0 +1,108 @@
+"""
+Micro-batcher: coalesce single-item requests arriving close together into one batch call
+"""
+import time
+import queue
+import threading
+from concurrent.futures import Future
+from typing import Any, Callable, List
+import logging
+
+logger = logging.getLogger(__name__)
+
+class MicroBatcher:
+    """
+    Collect items submitted from any thread and process them in batches
+
+    A background thread waits for the first item, keeps collecting for up to
+    `max_wait` seconds (or until `max_batch_size` items), then calls
+    `batch_fn` once for the whole batch. Each caller gets a
+    concurrent.futures.Future, so async code can `await asyncio.wrap_future(...)`
+    from whichever event loop it runs in.
+    """
+
+    def __init__(self, batch_fn: Callable[[List[Any]], List[Any]], max_batch_size: int = 32,
+                 max_wait: float = 0.05, name: str = "micro-batcher"):
+        """
+        Initialize the batcher
+
+        Args:
+            batch_fn: Function mapping a list of items to a list of results in the same order
+            max_batch_size: Maximum number of items per batch_fn call
+            max_wait: Seconds to wait for more items after the first one arrives
+            name: Name of the worker thread
+        """
+        self.batch_fn = batch_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.name = name
+        self._queue = queue.SimpleQueue()
+        self._worker = None
+        self._worker_lock = threading.Lock()
+
+    def submit(self, item: Any) -> Future:
+        """
+        Queue an item for the next batch
+
+        Args:
+            item: Item to process
+
+        Returns:
+            Future resolved with the item's result (or batch_fn's exception)
+        """
+        future = Future()
+        self._queue.put((item, future))
+        if self._worker is None:
+            self._start_worker()
+        return future
+
+    def _start_worker(self):
+        """Start the worker thread on first use"""
+        with self._worker_lock:
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._run, name=self.name, daemon=True)
+                self._worker.start()
+
+    def _run(self):
+        """Worker loop: gather one batch per window and process it"""
+        while True:
+            try:
+                batch = [self._queue.get()]
+                deadline = time.monotonic() + self.max_wait
+                while len(batch) < self.max_batch_size:
+                    timeout = deadline - time.monotonic()
+                    if timeout <= 0:
+                        break
+                    try:
+                        batch.append(self._queue.get(timeout=timeout))
+                    except queue.Empty:
+                        break
+                self._process(batch)
+            except Exception as e:
+                # Never let the worker die: later submits would wait forever
+                logger.error(f"Unexpected error in {self.name}: {e}")
+
+    def _process(self, batch: List[tuple]):
+        """
+        Run batch_fn and resolve each caller's future
+
+        Args:
+            batch: (item, future) pairs
+        """
+        # Drop items whose callers were cancelled while queued
+        batch = [(item, future) for item, future in batch if future.set_running_or_notify_cancel()]
+        if not batch:
+            return
+
+        try:
+            results = list(self.batch_fn([item for item, _ in batch]))
+            if len(results) != len(batch):
+                raise ValueError(f"batch_fn returned {len(results)} results for {len(batch)} items")
+        except Exception as e:
+            logger.error(f"Error processing batch of {len(batch)} items: {e}")
+            for _, future in batch:
+                future.set_exception(e)
+            return
+
+        for (_, future), result in zip(batch, results):
+            future.set_result(result)
@@ -1,22 +1,97 @@
 import time
-from typing import Dict, Any, List, Optional, Callable
+import functools
+import contextvars
+from typing import Dict, Any, List, Callable
 from datetime import datetime
+from types import MappingProxyType
 import threading
 import logging
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import get_system_config
 
 logger = logging.getLogger(__name__)
 
+# Keys whose values are visible to progress subscribers; an update that leaves
+# all of them unchanged does not trigger a notification
+_SIGNATURE_KEYS = ('stage', 'status', 'completed_readings', 'pruning_completed',
+                   'current_activity', 'documents_found', 'total_readings')
+
+@functools.lru_cache(maxsize=1024)
+def _pruning_activity(completed: int, total: int) -> str:
+    """Interned pruning activity message for a (completed, total) pair"""
+    return f'Pruning documents: {completed}/{total} completed'
+
+class ThreadLocalProgressRecorder:
+    """
+    Per-thread completion counts for the increment fast paths
+    
+    Each worker thread only ever writes to its own recorder, so incrementing
+    needs no lock. The tracker folds all recorders into the shared snapshot
+    when it next publishes. The epoch fields tie the counts to the counter
+    reset they were recorded after; counts from an older epoch are ignored.
+    """
+    __slots__ = ('pruning_epoch', 'pruning_completed', 'reading_epoch', 'completed_readings')
+    
+    def __init__(self, pruning_epoch: int, reading_epoch: int):
+        self.pruning_epoch = pruning_epoch
+        self.pruning_completed = 0
+        self.reading_epoch = reading_epoch
+        self.completed_readings = 0
+
 class ProgressTracker:
-    def __init__(self):
+    def __init__(self, batch_interval: float = None, max_batch_n: int = 50):
+        """
+        Initialize the progress tracker
+        
+        Args:
+            batch_interval: Seconds to coalesce updates before notifying callbacks (uses config if None)
+            max_batch_n: Number of pending updates that triggers an early notification
+        """
         self.current_stage = "idle"
-        self.progress_data = {}
+        # Progress data is published as an immutable snapshot: mutators build a
+        # new dict from the changed keys and swap it in, so readers and
+        # callbacks can share the current mapping without copying it
+        self._data = {}
+        self._view = MappingProxyType(self._data)
         self.start_time = None
         self.stage_start_time = None
         self.stage_durations = {}  # Track duration of each completed stage
-        self.document_processing_times = {}  # Track processing time for each document
+        # Per-document processing times, kept as parallel maps keyed by document name
+        self._doc_start = {}
+        self._doc_duration = {}
+        self._doc_end = {}
         self.callbacks = []
         self._lock = threading.Lock()
         
+        # Completion counters for the increment fast paths: worker threads
+        # count into their own ThreadLocalProgressRecorder and the totals are
+        # merged on top of the last absolute value set by the update_* methods
+        self._local = threading.local()
+        self._recorders = []
+        self._pruning_epoch = 0
+        self._pruning_base = 0
+        self._pruning_total = 0
+        self._reading_epoch = 0
+        self._reading_base = 0
+        self._last_read_document = None
+        self._unmerged = False
+        
+        # Batched notification state: mutators only mark the data dirty, the
+        # forwarder thread delivers one snapshot per batch window
+        if batch_interval is None:
+            batch_interval = get_system_config().PROGRESS_UPDATE_INTERVAL
+        self.batch_interval = batch_interval
+        self.max_batch_n = max_batch_n
+        self._dirty = False
+        self._pending_events = 0
+        self._last_snapshot_signature = None
+        self._wake = threading.Event()
+        self._dispatch_lock = threading.RLock()
+        self._forwarder = None
+        self._closed = threading.Event()
+        
     def register_callback(self, callback: Callable[[Dict[str, Any]], None]):
         """
         Register a callback function to be called on progress updates
@@ -26,8 +101,54 @@ class ProgressTracker:
         """
         with self._lock:
             self.callbacks.append(callback)
+            if self._forwarder is None:
+                self._forwarder = threading.Thread(
+                    target=self._forward_loop,
+                    name="progress-forwarder",
+                    daemon=True
+                )
+                self._forwarder.start()
         logger.info("Registered progress callback")
     
+    @property
+    def progress_data(self) -> MappingProxyType:
+        """Read-only view of the latest published snapshot (increment counts appear after the next merge)"""
+        return self._view
+    
+    @progress_data.setter
+    def progress_data(self, data: Dict[str, Any]):
+        with self._lock:
+            self._data = {}
+            self._commit(data)
+    
+    def _commit(self, delta: Dict[str, Any]):
+        """Publish a new snapshot with the given keys changed (must be called with lock held)"""
+        self._data = {**self._data, **delta}
+        self._view = MappingProxyType(self._data)
+    
+    def reset(self):
+        """
+        Return the tracker to its initial idle state so it can be reused
+        
+        Callbacks are dropped and the timing maps are cleared in place,
+        keeping their allocated storage for the next session.
+        """
+        with self._lock:
+            self.current_stage = "idle"
+            self.start_time = None
+            self.stage_start_time = None
+            self.stage_durations.clear()
+            self._doc_start.clear()
+            self._doc_duration.clear()
+            self._doc_end.clear()
+            self.callbacks.clear()
+            self._reset_recorders()
+            self._data = {}
+            self._view = MappingProxyType(self._data)
+            self._dirty = False
+            self._pending_events = 0
+            self._last_snapshot_signature = None
+    
     def start_session(self, query: str):
         """
         Start a new progress tracking session
@@ -35,11 +156,14 @@ class ProgressTracker:
         Args:
             query: The user query being processed
         """
+        now = time.perf_counter()
         with self._lock:
-            self.start_time = time.time()
-            self.stage_start_time = time.time()
+            self.start_time = now
+            self.stage_start_time = now
             self.current_stage = "started"
-            self.progress_data = {
+            self._reset_recorders()
+            self._data = {}
+            self._commit({
                 'query': query,
                 'stage': self.current_stage,
                 'status': 'Research started',
@@ -54,9 +178,9 @@ class ProgressTracker:
                 'total_pruning': 0,
                 'stages_completed': [],
                 'current_activity': 'Starting research process'
-            }
-            
-        self._notify_callbacks()
+            })
+            self._schedule_notify()
+        
         logger.info(f"Started progress session for query: {query[:50]}...")
     
     def update_stage(self, stage: str, status: str, activity: str = ""):
@@ -68,33 +192,34 @@ class ProgressTracker:
             status: Status message for the stage
             activity: Current activity description
         """
+        now = time.perf_counter()
         with self._lock:
-            current_time = time.time()
-            
-            if self.current_stage != "idle" and self.stage_start_time:
+            delta = {}
+            if self.current_stage != "idle" and self.stage_start_time is not None:
                 # Calculate and store duration of previous stage
-                previous_stage_duration = current_time - self.stage_start_time
+                previous_stage_duration = now - self.stage_start_time
                 self.stage_durations[self.current_stage] = previous_stage_duration
                 
                 # Mark previous stage as completed
-                if self.current_stage not in self.progress_data.get('stages_completed', []):
-                    self.progress_data.setdefault('stages_completed', []).append(self.current_stage)
+                stages_completed = self._data.get('stages_completed', [])
+                if self.current_stage not in stages_completed:
+                    delta['stages_completed'] = stages_completed + [self.current_stage]
             
             self.current_stage = stage
-            self.stage_start_time = current_time
+            self.stage_start_time = now
             
-            self.progress_data.update({
+            delta.update({
                 'stage': stage,
                 'status': status,
                 'stage_elapsed_time': 0,
-                'current_activity': activity or status,
-                'stage_durations': self.stage_durations.copy()
+                'current_activity': activity or status
             })
             
-            if self.start_time:
-                self.progress_data['elapsed_time'] = current_time - self.start_time
+            if self.start_time is not None:
+                delta['elapsed_time'] = now - self.start_time
+            self._commit(delta)
+            self._schedule_notify()
         
-        self._notify_callbacks()
         logger.info(f"Stage updated: {stage} - {status}")
     
     def update_retrieval(self, documents_found: int):
@@ -104,14 +229,19 @@ class ProgressTracker:
         Args:
             documents_found: Number of documents found
         """
+        now = time.perf_counter()
         with self._lock:
-            self.progress_data.update({
+            delta = {
                 'documents_found': documents_found,
                 'current_activity': f'Found {documents_found} relevant documents'
-            })
-            self._update_times()
+            }
+            if self.start_time is not None:
+                delta['elapsed_time'] = now - self.start_time
+            if self.stage_start_time is not None:
+                delta['stage_elapsed_time'] = now - self.stage_start_time
+            self._commit(delta)
+            self._schedule_notify()
         
-        self._notify_callbacks()
         logger.info(f"Retrieval updated: {documents_found} documents found")
     
     def update_pruning(self, completed: int, total: int):
@@ -122,15 +252,23 @@ class ProgressTracker:
             completed: Number of completed pruning operations
             total: Total number of pruning operations
         """
+        now = time.perf_counter()
         with self._lock:
-            self.progress_data.update({
+            self._pruning_epoch += 1
+            self._pruning_base = completed
+            self._pruning_total = total
+            delta = {
                 'pruning_completed': completed,
                 'total_pruning': total,
-                'current_activity': f'Pruning documents: {completed}/{total} completed'
-            })
-            self._update_times()
+                'current_activity': _pruning_activity(completed, total)
+            }
+            if self.start_time is not None:
+                delta['elapsed_time'] = now - self.start_time
+            if self.stage_start_time is not None:
+                delta['stage_elapsed_time'] = now - self.stage_start_time
+            self._commit(delta)
+            self._schedule_notify()
         
-        self._notify_callbacks()
         logger.info(f"Pruning progress: {completed}/{total}")
     
     def increment_pruning(self, total: int):
@@ -140,18 +278,19 @@ class ProgressTracker:
         Args:
             total: Total number of pruning operations
         """
-        with self._lock:
-            current_completed = self.progress_data.get('pruning_completed', 0)
-            new_completed = current_completed + 1
-            self.progress_data.update({
-                'pruning_completed': new_completed,
-                'total_pruning': total,
-                'current_activity': f'Pruning documents: {new_completed}/{total} completed'
-            })
-            self._update_times()
+        # No lock here: the count goes to this thread's recorder and is
+        # published by the next merge (forwarder batch, flush or read)
+        recorder = self._get_recorder()
+        if recorder.pruning_epoch != self._pruning_epoch:
+            recorder.pruning_epoch = self._pruning_epoch
+            recorder.pruning_completed = 0
+        recorder.pruning_completed += 1
+        self._pruning_total = total
+        self._unmerged = True
         
-        self._notify_callbacks()
-        logger.info(f"Pruning progress incremented: {new_completed}/{total}")
+        # Per-document hot path: skip message formatting when INFO is disabled
+        if logger.isEnabledFor(logging.INFO):
+            logger.info(f"Pruning progress incremented ({total} total)")
     
     def update_reading_start(self, documents: List[str], chunk_info: Dict[str, Dict] = None):
         """
@@ -161,9 +300,12 @@ class ProgressTracker:
             documents: List of document names being read
             chunk_info: Optional dict with chunk information for each document
         """
+        now = time.perf_counter()
         with self._lock:
             # Initialize document statuses
             document_statuses = {doc: "pending" for doc in documents}
+            self._reading_epoch += 1
+            self._reading_base = 0
             
             # Initialize chunk information if provided
             document_chunks = {}
@@ -174,7 +316,7 @@ class ProgressTracker:
                     document_chunks[doc] = doc_chunk_info.get('total_chunks', 0)
                     document_relevant_chunks[doc] = doc_chunk_info.get('relevant_chunks', 0)
             
-            self.progress_data.update({
+            delta = {
                 'documents_being_read': documents.copy(),
                 'document_statuses': document_statuses,
                 'total_readings': len(documents),
@@ -182,10 +324,14 @@ class ProgressTracker:
                 'current_activity': f'Reading {len(documents)} relevant documents',
                 'document_chunks': document_chunks,
                 'document_relevant_chunks': document_relevant_chunks
-            })
-            self._update_times()
+            }
+            if self.start_time is not None:
+                delta['elapsed_time'] = now - self.start_time
+            if self.stage_start_time is not None:
+                delta['stage_elapsed_time'] = now - self.stage_start_time
+            self._commit(delta)
+            self._schedule_notify()
         
-        self._notify_callbacks()
         logger.info(f"Reading started: {len(documents)} documents")
     
     def update_reading_progress(self, document_name: str, completed_count: int):
@@ -196,15 +342,23 @@ class ProgressTracker:
             document_name: Name of the document being read
             completed_count: Number of completed readings
         """
+        now = time.perf_counter()
         with self._lock:
-            self.progress_data.update({
+            self._reading_epoch += 1
+            self._reading_base = completed_count
+            delta = {
                 'completed_readings': completed_count,
                 'current_activity': f'Reading {document_name}' if document_name else f'Reading completed: {completed_count} documents'
-            })
-            self._update_times()
+            }
+            if self.start_time is not None:
+                delta['elapsed_time'] = now - self.start_time
+            if self.stage_start_time is not None:
+                delta['stage_elapsed_time'] = now - self.stage_start_time
+            self._commit(delta)
+            self._schedule_notify()
         
-        self._notify_callbacks()
-        logger.info(f"Reading progress: {document_name} ({completed_count}/{self.progress_data.get('total_readings', 0)})")
+        if logger.isEnabledFor(logging.INFO):
+            logger.info(f"Reading progress: {document_name} ({completed_count}/{self.progress_data.get('total_readings', 0)})")
     
     def increment_reading(self, document_name: str):
         """
@@ -213,18 +367,17 @@ class ProgressTracker:
         Args:
             document_name: Name of the document being read
         """
-        with self._lock:
-            current_completed = self.progress_data.get('completed_readings', 0)
-            new_completed = current_completed + 1
-            total = self.progress_data.get('total_readings', 0)
-            self.progress_data.update({
-                'completed_readings': new_completed,
-                'current_activity': f'Completed reading {document_name}'
-            })
-            self._update_times()
+        # Lock-free thread-local count (see increment_pruning)
+        recorder = self._get_recorder()
+        if recorder.reading_epoch != self._reading_epoch:
+            recorder.reading_epoch = self._reading_epoch
+            recorder.completed_readings = 0
+        recorder.completed_readings += 1
+        self._last_read_document = document_name
+        self._unmerged = True
         
-        self._notify_callbacks()
-        logger.info(f"Reading progress incremented: {document_name} ({new_completed}/{total})")
+        if logger.isEnabledFor(logging.INFO):
+            logger.info(f"Reading progress incremented: {document_name}")
     
     def update_document_status(self, document_name: str, status: str):
         """
@@ -234,49 +387,55 @@ class ProgressTracker:
             document_name: Name of the document
             status: Status of the document ("pending", "reading", "completed", "error")
         """
+        now = time.perf_counter()
         with self._lock:
-            current_time = time.time()
-            
-            if 'document_statuses' not in self.progress_data:
-                self.progress_data['document_statuses'] = {}
+            delta = {}
             
             # Track document processing start time
-            if status == "reading" and document_name not in self.document_processing_times:
-                self.document_processing_times[document_name] = {'start_time': current_time, 'duration': 0}
+            if status == "reading" and document_name not in self._doc_start:
+                self._doc_start[document_name] = now
+                self._doc_duration[document_name] = 0
             
             # Calculate processing duration when completed
-            if status in ["completed", "error"] and document_name in self.document_processing_times:
-                start_time = self.document_processing_times[document_name]['start_time']
-                duration = current_time - start_time
-                self.document_processing_times[document_name]['duration'] = duration
-                self.document_processing_times[document_name]['end_time'] = current_time
+            if status in ["completed", "error"] and document_name in self._doc_start:
+                self._doc_duration[document_name] = now - self._doc_start[document_name]
+                self._doc_end[document_name] = now
             
-            self.progress_data['document_statuses'][document_name] = status
-            self.progress_data['document_processing_times'] = self.document_processing_times.copy()
+            delta['document_statuses'] = {**self._data.get('document_statuses', {}), document_name: status}
             
             # Update activity message based on status
             if status == "reading":
-                self.progress_data['current_activity'] = f'Reading {document_name}'
+                delta['current_activity'] = f'Reading {document_name}'
             elif status == "completed":
-                duration = self.document_processing_times.get(document_name, {}).get('duration', 0)
-                self.progress_data['current_activity'] = f'Completed {document_name} ({duration:.1f}s)'
+                duration = self._doc_duration.get(document_name, 0)
+                delta['current_activity'] = f'Completed {document_name} ({duration:.1f}s)'
             elif status == "error":
-                self.progress_data['current_activity'] = f'Error reading {document_name}'
+                delta['current_activity'] = f'Error reading {document_name}'
             
-            self._update_times()
+            if self.start_time is not None:
+                delta['elapsed_time'] = now - self.start_time
+            if self.stage_start_time is not None:
+                delta['stage_elapsed_time'] = now - self.stage_start_time
+            self._commit(delta)
+            self._schedule_notify()
         
-        self._notify_callbacks()
-        logger.info(f"Document status updated: {document_name} -> {status}")
+        if logger.isEnabledFor(logging.INFO):
+            logger.info(f"Document status updated: {document_name} -> {status}")
     
     def update_aggregation(self):
         """Update when aggregation stage starts"""
+        now = time.perf_counter()
         with self._lock:
-            self.progress_data.update({
+            delta = {
                 'current_activity': 'Synthesizing final response'
-            })
-            self._update_times()
+            }
+            if self.start_time is not None:
+                delta['elapsed_time'] = now - self.start_time
+            if self.stage_start_time is not None:
+                delta['stage_elapsed_time'] = now - self.stage_start_time
+            self._commit(delta)
+            self._schedule_notify()
         
-        self._notify_callbacks()
         logger.info("Aggregation stage started")
     
     def complete_session(self, success: bool = True, final_message: str = ""):
@@ -287,57 +446,210 @@ class ProgressTracker:
             success: Whether the session completed successfully
             final_message: Final status message
         """
+        now = time.perf_counter()
         with self._lock:
-            current_time = time.time()
-            
             # Finalize current stage duration
-            if self.current_stage != "idle" and self.stage_start_time:
-                final_stage_duration = current_time - self.stage_start_time
+            if self.current_stage != "idle" and self.stage_start_time is not None:
+                final_stage_duration = now - self.stage_start_time
                 self.stage_durations[self.current_stage] = final_stage_duration
             
             self.current_stage = "completed" if success else "failed"
             status = final_message or ("Research completed successfully" if success else "Research failed")
             
-            self.progress_data.update({
+            delta = {
                 'stage': self.current_stage,
                 'status': status,
                 'current_activity': status,
                 'completed': True,
-                'success': success,
-                'stage_durations': self.stage_durations.copy(),
-                'document_processing_times': self.document_processing_times.copy()
-            })
-            self._update_times()
+                'success': success
+            }
+            if self.start_time is not None:
+                delta['elapsed_time'] = now - self.start_time
+            if self.stage_start_time is not None:
+                delta['stage_elapsed_time'] = now - self.stage_start_time
+            self._commit(delta)
+            self._schedule_notify()
         
-        self._notify_callbacks()
+        self.flush()
         logger.info(f"Session completed: success={success}, message='{final_message}'")
     
-    def _update_times(self):
-        """Update elapsed time fields (must be called with lock held)"""
-        if self.start_time:
-            self.progress_data['elapsed_time'] = time.time() - self.start_time
-        if self.stage_start_time:
-            self.progress_data['stage_elapsed_time'] = time.time() - self.stage_start_time
-    
-    def _notify_callbacks(self):
-        """Notify all registered callbacks (must be called with lock held)"""
-        progress_copy = self.progress_data.copy()
-        for callback in self.callbacks:
+    def _get_recorder(self) -> ThreadLocalProgressRecorder:
+        """Return the calling thread's recorder, registering it on first use"""
+        local = self._local
+        recorder = getattr(local, 'recorder', None)
+        if recorder is None:
+            with self._lock:
+                recorder = ThreadLocalProgressRecorder(self._pruning_epoch, self._reading_epoch)
+                self._recorders.append(recorder)
+            local.recorder = recorder
+        return recorder
+    
+    def _reset_recorders(self):
+        """Drop all thread-local recorders and counter state (must be called with lock held)"""
+        self._local = threading.local()
+        self._recorders = []
+        self._pruning_epoch += 1
+        self._pruning_base = 0
+        self._pruning_total = 0
+        self._reading_epoch += 1
+        self._reading_base = 0
+        self._last_read_document = None
+        self._unmerged = False
+    
+    def _merge_recorders(self, now: float):
+        """Fold thread-local counts into the published snapshot (must be called with lock held)"""
+        if not self._unmerged:
+            return
+        self._unmerged = False
+        
+        pruning_completed = self._pruning_base
+        completed_readings = self._reading_base
+        for recorder in self._recorders:
+            if recorder.pruning_epoch == self._pruning_epoch:
+                pruning_completed += recorder.pruning_completed
+            if recorder.reading_epoch == self._reading_epoch:
+                completed_readings += recorder.completed_readings
+        
+        delta = {}
+        if pruning_completed != self._data.get('pruning_completed'):
+            total = self._pruning_total
+            delta['pruning_completed'] = pruning_completed
+            delta['total_pruning'] = total
+            delta['current_activity'] = _pruning_activity(pruning_completed, total)
+        if completed_readings != self._data.get('completed_readings'):
+            delta['completed_readings'] = completed_readings
+            delta['current_activity'] = f'Completed reading {self._last_read_document}'
+        if not delta:
+            return
+        
+        if self.start_time is not None:
+            delta['elapsed_time'] = now - self.start_time
+        if self.stage_start_time is not None:
+            delta['stage_elapsed_time'] = now - self.stage_start_time
+        self._commit(delta)
+        self._schedule_notify()
+    
+    def _schedule_notify(self):
+        """Mark progress as changed for the next batch (must be called with lock held)"""
+        data = self._data
+        signature = tuple(data.get(key) for key in _SIGNATURE_KEYS)
+        if signature == self._last_snapshot_signature:
+            return
+        self._last_snapshot_signature = signature
+        self._dirty = True
+        self._pending_events += 1
+        if self._pending_events >= self.max_batch_n:
+            self._wake.set()
+    
+    def _forward_loop(self):
+        """Background loop that coalesces updates into one notification per batch window"""
+        while not self._closed.is_set():
+            self._wake.wait(timeout=self.batch_interval)
+            self._wake.clear()
+            if self._closed.is_set():
+                break
+            self._dispatch_pending()
+    
+    def close(self):
+        """
+        Stop the forwarder thread so a discarded tracker can be freed
+        
+        Pending updates are not delivered; call flush() first if they matter.
+        The tracker must not be used after closing.
+        """
+        self._closed.set()
+        self._wake.set()
+        with self._lock:
+            self._forwarder = None
+    
+    def _dispatch_pending(self):
+        """Deliver the latest snapshot to all callbacks if anything changed since the last delivery"""
+        with self._dispatch_lock:
+            with self._lock:
+                self._merge_recorders(time.perf_counter())
+                if not self._dirty:
+                    return
+                self._dirty = False
+                self._pending_events = 0
+                snapshot = self._view
+                callbacks = list(self.callbacks)
+            
+            # Callbacks run outside the lock so slow subscribers don't block producers
+            self._notify_callbacks(snapshot, callbacks)
+    
+    @staticmethod
+    def _notify_callbacks(snapshot: Dict[str, Any], callbacks: List[Callable[[Dict[str, Any]], None]]):
+        """
+        Notify the given callbacks with a progress snapshot
+        
+        Args:
+            snapshot: Read-only progress snapshot shared by all callbacks
+            callbacks: Copy of the registered callbacks taken under the lock
+        """
+        for callback in callbacks:
             try:
-                callback(progress_copy)
+                callback(snapshot)
             except Exception as e:
                 logger.error(f"Error in progress callback: {e}")
     
-    def get_current_progress(self) -> Dict[str, Any]:
+    def flush(self):
+        """Synchronously deliver any pending update (used to guarantee the terminal state is sent)"""
+        self._dispatch_pending()
+    
+    def get_current_progress(self) -> MappingProxyType:
         """
         Get current progress data
         
         Returns:
-            Dictionary with current progress information
+            Read-only mapping with current progress information, including
+            stage durations and per-document processing times
         """
+        now = time.perf_counter()
         with self._lock:
-            self._update_times()
-            return self.progress_data.copy()
+            self._merge_recorders(now)
+            # Elapsed times are computed for this read only; the published
+            # snapshot is left alone so polling doesn't create new versions
+            current = {**self._data}
+            if self.start_time is not None:
+                current['elapsed_time'] = now - self.start_time
+            if self.stage_start_time is not None:
+                current['stage_elapsed_time'] = now - self.stage_start_time
+            current['stage_durations'] = self.stage_durations.copy()
+            current['document_processing_times'] = self._build_document_processing_times()
+            return MappingProxyType(current)
+    
+    def get_stage_durations(self) -> Dict[str, float]:
+        """
+        Get the durations of all completed stages
+        
+        Stage durations are not part of the per-update snapshot; callbacks
+        that need them pull them here on demand.
+        
+        Returns:
+            Dict mapping stage name to duration in seconds
+        """
+        with self._lock:
+            return self.stage_durations.copy()
+    
+    def get_document_processing_times(self) -> Dict[str, Dict[str, float]]:
+        """
+        Get per-document processing times
+        
+        Returns:
+            Dict mapping document name to {'start_time', 'duration'[, 'end_time']}
+        """
+        with self._lock:
+            return self._build_document_processing_times()
+    
+    def _build_document_processing_times(self) -> Dict[str, Dict[str, float]]:
+        """Materialize the nested per-document timing view (must be called with lock held)"""
+        timings = {}
+        for name, start_time in self._doc_start.items():
+            timing = {'start_time': start_time, 'duration': self._doc_duration.get(name, 0)}
+            if name in self._doc_end:
+                timing['end_time'] = self._doc_end[name]
+            timings[name] = timing
+        return timings
     
     def get_stage_duration(self, stage: str) -> float:
         """
@@ -363,23 +675,112 @@ class ProgressTracker:
             Processing time in seconds, or 0 if document not found
         """
         with self._lock:
-            doc_timing = self.document_processing_times.get(document_name, {})
-            return doc_timing.get('duration', 0.0)
+            return self._doc_duration.get(document_name, 0.0)
+
+class ProgressTrackerPool:
+    """Pool of reusable ProgressTracker instances for short-lived sessions"""
+    
+    def __init__(self, max_size: int = 32):
+        """
+        Initialize the pool
+        
+        Args:
+            max_size: Maximum number of idle trackers kept for reuse
+        """
+        self.max_size = max_size
+        self._idle = []
+        self._lock = threading.Lock()
+    
+    def acquire(self) -> ProgressTracker:
+        """
+        Get an idle tracker, creating one if the pool is empty
+        
+        Returns:
+            ProgressTracker ready for a new session
+        """
+        with self._lock:
+            if self._idle:
+                return self._idle.pop()
+        return ProgressTracker()
+    
+    def release(self, tracker: ProgressTracker):
+        """
+        Deliver any pending update, reset the tracker and return it to the pool
+        
+        Trackers that don't fit in the pool are closed so their forwarder
+        thread exits.
+        
+        Args:
+            tracker: Tracker previously obtained from acquire()
+        """
+        tracker.flush()
+        tracker.reset()
+        with self._lock:
+            if len(self._idle) < self.max_size:
+                self._idle.append(tracker)
+                return
+        tracker.close()
 
-# Global progress tracker instance
-_progress_tracker = None
+# Global tracker pool instance
+_progress_tracker_pool = None
+
+def get_progress_tracker_pool() -> ProgressTrackerPool:
+    """
+    Get singleton instance of the progress tracker pool
+    
+    Returns:
+        ProgressTrackerPool instance
+    """
+    global _progress_tracker_pool
+    if _progress_tracker_pool is None:
+        _progress_tracker_pool = ProgressTrackerPool()
+    return _progress_tracker_pool
+
+# Progress tracker for the current request context. Concurrent requests each set
+# their own tracker so they don't share state or contend on one lock; code that
+# never sets one (CLI runs) falls back to a process-wide default tracker.
+_progress_tracker_var: contextvars.ContextVar[ProgressTracker] = contextvars.ContextVar('progress_tracker')
+_default_progress_tracker = None
+_default_tracker_lock = threading.Lock()
 
 def get_progress_tracker() -> ProgressTracker:
     """
-    Get singleton instance of progress tracker
+    Get the progress tracker for the current context
+    
+    Returns:
+        ProgressTracker set for this context, or the process-wide default
+    """
+    tracker = _progress_tracker_var.get(None)
+    if tracker is not None:
+        return tracker
+    
+    global _default_progress_tracker
+    if _default_progress_tracker is None:
+        with _default_tracker_lock:
+            if _default_progress_tracker is None:
+                _default_progress_tracker = ProgressTracker()
+    return _default_progress_tracker
+
+def set_progress_tracker(tracker: ProgressTracker) -> contextvars.Token:
+    """
+    Use the given tracker for the current context (e.g. one request)
     
+    Args:
+        tracker: ProgressTracker to use for this context
+        
     Returns:
-        ProgressTracker instance
+        Token that can be passed to reset_progress_tracker
+    """
+    return _progress_tracker_var.set(tracker)
+
+def reset_progress_tracker(token: contextvars.Token):
+    """
+    Restore the tracker that was active before set_progress_tracker
+    
+    Args:
+        token: Token returned by set_progress_tracker
     """
-    global _progress_tracker
-    if _progress_tracker is None:
-        _progress_tracker = ProgressTracker()
-    return _progress_tracker
+    _progress_tracker_var.reset(token)
 
 # Convenience functions
 def start_progress_session(query: str):
@@ -454,4 +855,4 @@ if __name__ == "__main__":
     tracker.complete_session(True, "Research completed successfully")
     
     final_progress = tracker.get_current_progress()
-    print(f"\nFinal progress: {json.dumps(final_progress, indent=2)}")
+    print(f"\nFinal progress: {json.dumps(dict(final_progress), indent=2)}")
@@ -0,0 +1,92 @@
+"""
+Semantic query cache: reuse answers for queries whose embeddings are near-duplicates
+"""
+import threading
+import numpy as np
+from typing import Any, Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+class SemanticQueryCache:
+    """Fixed-capacity cache of query embeddings and payloads with LRU eviction"""
+
+    def __init__(self, capacity: int = 512, threshold: float = 0.93):
+        """
+        Initialize the semantic cache
+
+        Args:
+            capacity: Maximum number of cached queries
+            threshold: Minimum cosine similarity for a cache hit
+        """
+        self.capacity = capacity
+        self.threshold = threshold
+        self._lock = threading.Lock()
+        self._matrix = None  # (capacity, dim) normalized embeddings, allocated on first insert
+        self._namespaces = [None] * capacity
+        self._payloads = [None] * capacity
+        self._last_used = np.zeros(capacity, dtype=np.int64)
+        self._tick = 0
+        self._size = 0
+
+    @staticmethod
+    def _normalize(embedding) -> np.ndarray:
+        """Return the embedding as a unit-length float32 vector"""
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def lookup(self, embedding, namespace: str = None) -> Optional[Any]:
+        """
+        Find the payload of the most similar cached query
+
+        Args:
+            embedding: Query embedding
+            namespace: Only entries stored under the same namespace can match
+
+        Returns:
+            Cached payload if the best match is at or above the threshold, else None
+        """
+        query = self._normalize(embedding)
+        with self._lock:
+            if not self._size:
+                return None
+
+            scores = self._matrix[:self._size] @ query
+            best_index, best_score = None, self.threshold
+            for i in np.flatnonzero(scores >= self.threshold):
+                if self._namespaces[i] == namespace and scores[i] >= best_score:
+                    best_index, best_score = i, scores[i]
+            if best_index is None:
+                return None
+
+            self._tick += 1
+            self._last_used[best_index] = self._tick
+            logger.info(f"Semantic cache hit (similarity {best_score:.3f})")
+            return self._payloads[best_index]
+
+    def insert(self, embedding, payload: Any, namespace: str = None):
+        """
+        Cache a payload for a query, evicting the least recently used entry when full
+
+        Args:
+            embedding: Query embedding
+            payload: Value returned by lookup() for similar queries
+            namespace: Namespace the entry is stored under
+        """
+        vector = self._normalize(embedding)
+        with self._lock:
+            if self._matrix is None:
+                self._matrix = np.zeros((self.capacity, vector.shape[0]), dtype=np.float32)
+
+            if self._size < self.capacity:
+                index = self._size
+                self._size += 1
+            else:
+                index = int(np.argmin(self._last_used))
+
+            self._matrix[index] = vector
+            self._namespaces[index] = namespace
+            self._payloads[index] = payload
+            self._tick += 1
+            self._last_used[index] = self._tick
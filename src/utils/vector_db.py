@@ -1,14 +1,61 @@
 import chromadb
 from chromadb.utils import embedding_functions
+import torch
 import os
-from typing import List, Dict, Any, Tuple
+from typing import List, Dict, Any, Tuple, Iterator, Set
 import logging
 import sys
+import time
+import threading
+from collections import OrderedDict
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from config import get_system_config, get_vector_db_config
 
 logger = logging.getLogger(__name__)
 
+# Embedding functions keyed by (model_name, device); loading a SentenceTransformer
+# is expensive, so every VectorDatabase instance shares the same one
+_EMBEDDING_FN_CACHE: Dict[Tuple[str, str], Any] = {}
+
+# (device, description) resolved once per process; CUDA runtime queries are slow
+_DEVICE_CACHE = None
+
+def _get_device() -> Tuple[str, str]:
+    """
+    Detect the embedding device once and cache it
+    
+    Returns:
+        Tuple of (device, human-readable device description)
+    """
+    global _DEVICE_CACHE
+    if _DEVICE_CACHE is None:
+        if torch.cuda.is_available():
+            _DEVICE_CACHE = ("cuda", f"GPU ({torch.cuda.get_device_name(0)})")
+        else:
+            _DEVICE_CACHE = ("cpu", "CPU")
+    return _DEVICE_CACHE
+
+def _get_embedding_function(model_name: str, device: str):
+    """
+    Get a shared SentenceTransformer embedding function, loading it on first use
+    
+    Args:
+        model_name: Name of the SentenceTransformer model
+        device: Device to run the model on ("cuda" or "cpu")
+        
+    Returns:
+        Embedding function usable by ChromaDB collections
+    """
+    key = (model_name, device)
+    embedding_function = _EMBEDDING_FN_CACHE.get(key)
+    if embedding_function is None:
+        embedding_function = embedding_functions.SentenceTransformerEmbeddingFunction(
+            model_name=model_name,
+            device=device
+        )
+        _EMBEDDING_FN_CACHE[key] = embedding_function
+    return embedding_function
+
 class VectorDatabase:
     def __init__(self, persist_directory: str = None):
         """
@@ -24,17 +71,31 @@ class VectorDatabase:
         self.client = chromadb.PersistentClient(path=persist_dir)
         
         # Check for GPU availability
-        import torch
-        device = "cuda" if torch.cuda.is_available() else "cpu"
+        device, device_info = _get_device()
         
-        # Initialize embedding function with optimizations
-        self.embedding_function = embedding_functions.SentenceTransformerEmbeddingFunction(
-            model_name=vdb_config.EMBEDDING_MODEL,
-            device=device  # Use GPU if available
-        )
+        # Reuse the process-wide embedding function (GPU if available)
+        self.embedding_function = _get_embedding_function(vdb_config.EMBEDDING_MODEL, device)
         self.collection = None
         
-        device_info = f"GPU ({torch.cuda.get_device_name(0)})" if device == "cuda" else "CPU"
+        # Pending documents buffered by add_documents until a full batch is ready
+        self.batch_size = vdb_config.ADD_BATCH_SIZE
+        self.flush_interval = vdb_config.ADD_FLUSH_INTERVAL
+        self._pending_texts = []
+        self._pending_metadatas = []
+        self._pending_ids = []
+        self._pending_id_set = set()
+        self._last_flush = time.perf_counter()
+        
+        # IDs already stored in the current collection, loaded lazily on the
+        # first add so query-only users never pay for the scan. Queued IDs are
+        # tracked in _pending_id_set and only move here once written
+        self._seen_ids = None
+        
+        # Memoize query embeddings so repeated queries skip the model forward pass
+        self._query_embeddings = OrderedDict()
+        self._query_embeddings_size = 1024
+        self._query_embeddings_lock = threading.Lock()
+        
         logger.info(f"Initialized vector database at {persist_dir} using {device_info}")
     
     def create_or_get_collection(self, collection_name: str = "legal_cases"):
@@ -44,41 +105,106 @@ class VectorDatabase:
         Args:
             collection_name: Name of the collection
         """
-        try:
-            self.collection = self.client.get_collection(
-                name=collection_name,
-                embedding_function=self.embedding_function
-            )
-            logger.info(f"Retrieved existing collection: {collection_name}")
-        except:
-            self.collection = self.client.create_collection(
-                name=collection_name,
-                embedding_function=self.embedding_function
-            )
-            logger.info(f"Created new collection: {collection_name}")
+        # Single round trip; real errors (permissions, corrupt DB) propagate
+        # instead of being mistaken for a missing collection
+        self.collection = self.client.get_or_create_collection(
+            name=collection_name,
+            embedding_function=self.embedding_function
+        )
+        self._seen_ids = None
+        logger.info(f"Using collection: {collection_name}")
         
         return self.collection
     
     def add_documents(self, texts: List[str], metadatas: List[Dict], ids: List[str]):
         """
-        Add documents to the vector database with optimized batching
+        Queue documents for insertion; full batches are written immediately
+        
+        Documents whose ID is already in the collection (or already queued) are
+        skipped, so re-running ingest does not re-embed them. A partial batch is
+        only written when a later add finds flush_interval has passed, so call
+        flush() after the last add to write any remaining documents.
         
         Args:
             texts: List of document texts
             metadatas: List of metadata dictionaries
             ids: List of unique document IDs
         """
+        seen_ids = self._get_seen_ids()
+        pending_ids = self._pending_id_set
+        if seen_ids.isdisjoint(ids) and pending_ids.isdisjoint(ids):
+            self._pending_texts.extend(texts)
+            self._pending_metadatas.extend(metadatas)
+            self._pending_ids.extend(ids)
+            pending_ids.update(ids)
+        else:
+            for text, metadata, doc_id in zip(texts, metadatas, ids):
+                if doc_id in seen_ids or doc_id in pending_ids:
+                    continue
+                pending_ids.add(doc_id)
+                self._pending_texts.append(text)
+                self._pending_metadatas.append(metadata)
+                self._pending_ids.append(doc_id)
+        
+        while len(self._pending_ids) >= self.batch_size:
+            self._write_batch(self.batch_size)
+        
+        if self._pending_ids and time.perf_counter() - self._last_flush >= self.flush_interval:
+            self.flush()
+        # Don't log for each mini-batch to reduce I/O overhead
+    
+    def _get_seen_ids(self) -> Set[str]:
+        """
+        Get the set of IDs already present in the collection
+        
+        Returns:
+            Set of document IDs written to the collection
+        """
+        if not self.collection:
+            self.create_or_get_collection()
+        if self._seen_ids is None:
+            # include=[] fetches only the IDs, no documents or embeddings
+            self._seen_ids = set(self.collection.get(include=[])['ids'])
+            if self._seen_ids:
+                logger.info(f"Loaded {len(self._seen_ids)} existing document IDs")
+        return self._seen_ids
+    
+    def flush(self):
+        """Write all queued documents to the collection"""
+        while self._pending_ids:
+            self._write_batch(self.batch_size)
+    
+    def _write_batch(self, size: int):
+        """
+        Write up to `size` queued documents in a single collection.add call
+        
+        If the add fails the documents stay queued and are not marked as seen,
+        so a later flush() or add retries them.
+        
+        Args:
+            size: Maximum number of documents to write
+        """
         if not self.collection:
             self.create_or_get_collection()
         
-        # Add with optimized parameters
-        # ChromaDB will generate embeddings internally
+        texts = self._pending_texts[:size]
+        metadatas = self._pending_metadatas[:size]
+        ids = self._pending_ids[:size]
+        
+        # ChromaDB will generate embeddings internally, one encode call per batch
         self.collection.add(
             documents=texts,
             metadatas=metadatas,
             ids=ids
         )
-        # Don't log for each mini-batch to reduce I/O overhead
+        
+        del self._pending_texts[:size]
+        del self._pending_metadatas[:size]
+        del self._pending_ids[:size]
+        self._pending_id_set.difference_update(ids)
+        if self._seen_ids is not None:
+            self._seen_ids.update(ids)
+        self._last_flush = time.perf_counter()
     
     def search(self, query: str, n_results: int = 10, similarity_threshold: float = 0.5) -> List[Dict[str, Any]]:
         """
@@ -92,32 +218,129 @@ class VectorDatabase:
         Returns:
             List of search results with documents, metadata, and scores
         """
+        filtered_results = list(self.search_iter(query, n_results, similarity_threshold))
+        
+        logger.info(f"Found {len(filtered_results)} documents above similarity threshold {similarity_threshold}")
+        return filtered_results
+    
+    def search_iter(self, query: str, n_results: int = 10, similarity_threshold: float = 0.5) -> Iterator[Dict[str, Any]]:
+        """
+        Search for similar documents, yielding results lazily in ranked order
+        
+        Callers that stop after the first few matches skip building the rest.
+        
+        Args:
+            query: Search query
+            n_results: Number of results to query
+            similarity_threshold: Minimum similarity score (0-1)
+            
+        Yields:
+            Search result dicts with text, metadata, score and id
+        """
         if not self.collection:
             self.create_or_get_collection()
+        self.flush()
         
+        # Only request the fields we use so embeddings never cross the IPC boundary
         results = self.collection.query(
-            query_texts=[query],
-            n_results=n_results
+            query_embeddings=[self.embed_query(query)],
+            n_results=n_results,
+            include=['documents', 'metadatas', 'distances']
         )
         
         # Filter results by similarity threshold
-        # Note: ChromaDB returns distances, we convert to similarity scores
-        filtered_results = []
+        # Note: ChromaDB returns distances, we convert to similarity scores (assuming cosine distance)
+        documents = results['documents'][0]
+        metadatas = results['metadatas'][0]
+        ids = results['ids'][0]
+        distances = results['distances'][0]
+        for text, metadata, doc_id, distance in zip(documents, metadatas, ids, distances):
+            score = 1.0 - distance
+            if score >= similarity_threshold:
+                yield {'text': text, 'metadata': metadata, 'score': score, 'id': doc_id}
+    
+    def search_batch(self, queries: List[str], n_results: int = 10, similarity_threshold: float = 0.5) -> List[List[Dict[str, Any]]]:
+        """
+        Search for several queries with one embedding call and one collection query
         
-        for i, distance in enumerate(results['distances'][0]):
-            # Convert distance to similarity score (assuming cosine distance)
-            similarity_score = 1.0 - distance
+        Args:
+            queries: Search queries
+            n_results: Number of results to query per search
+            similarity_threshold: Minimum similarity score (0-1)
             
-            if similarity_score >= similarity_threshold:
-                filtered_results.append({
-                    'text': results['documents'][0][i],
-                    'metadata': results['metadatas'][0][i],
-                    'score': similarity_score,
-                    'id': results['ids'][0][i]
-                })
+        Returns:
+            One list of search results per query, in the same order as queries
+        """
+        if not queries:
+            return []
+        if not self.collection:
+            self.create_or_get_collection()
+        self.flush()
         
-        logger.info(f"Found {len(filtered_results)} documents above similarity threshold {similarity_threshold}")
-        return filtered_results
+        results = self.collection.query(
+            query_embeddings=self.embed_queries(queries),
+            n_results=n_results,
+            include=['documents', 'metadatas', 'distances']
+        )
+        
+        batch_results = []
+        for documents, metadatas, ids, distances in zip(
+            results['documents'], results['metadatas'], results['ids'], results['distances']
+        ):
+            batch_results.append([
+                {'text': text, 'metadata': metadata, 'score': 1.0 - distance, 'id': doc_id}
+                for text, metadata, doc_id, distance in zip(documents, metadatas, ids, distances)
+                if 1.0 - distance >= similarity_threshold
+            ])
+        
+        logger.info(f"Batched search for {len(queries)} queries returned {sum(map(len, batch_results))} documents")
+        return batch_results
+    
+    def embed_query(self, query: str):
+        """
+        Embed a search query, reusing the memoized embedding used by search()
+        
+        Args:
+            query: Search query
+            
+        Returns:
+            Query embedding vector
+        """
+        return self.embed_queries([query])[0]
+    
+    def embed_queries(self, queries: List[str]) -> List[Any]:
+        """
+        Embed several search queries with one encoder call for the uncached ones
+        
+        Results are memoized, so a later search() for any of these queries
+        reuses the embedding.
+        
+        Args:
+            queries: Search queries
+            
+        Returns:
+            Query embedding vectors in the same order as queries
+        """
+        embeddings = {}
+        with self._query_embeddings_lock:
+            for query in queries:
+                if query in self._query_embeddings:
+                    self._query_embeddings.move_to_end(query)
+                    embeddings[query] = self._query_embeddings[query]
+        
+        missing = [query for query in dict.fromkeys(queries) if query not in embeddings]
+        if missing:
+            # Encode outside the lock so concurrent cached lookups aren't blocked
+            new_embeddings = self.embedding_function(missing)
+            with self._query_embeddings_lock:
+                for query, embedding in zip(missing, new_embeddings):
+                    embeddings[query] = embedding
+                    self._query_embeddings[query] = embedding
+                    self._query_embeddings.move_to_end(query)
+                while len(self._query_embeddings) > self._query_embeddings_size:
+                    self._query_embeddings.popitem(last=False)
+        
+        return [embeddings[query] for query in queries]
     
     def get_collection_stats(self) -> Dict[str, Any]:
         """
@@ -128,6 +351,7 @@ class VectorDatabase:
         """
         if not self.collection:
             self.create_or_get_collection()
+        self.flush()
         
         count = self.collection.count()
         return {
@@ -6,7 +6,18 @@ import logging
 import os
 import sys
 import asyncio
+import atexit
 import csv
+import functools
+import hashlib
+import json
+import pickle
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
 from pathlib import Path
 
 # Add parent directory to path for imports
@@ -14,16 +25,166 @@ sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from flow import create_online_research_flow
 from utils.vector_db import create_vector_db
-from config import get_vector_db_config
-import shelve
+from utils.semantic_cache import SemanticQueryCache
+from utils.ttl_cache import TTLCache
+from utils.micro_batcher import MicroBatcher
+from config import get_vector_db_config, get_whatsapp_config
 
 logger = logging.getLogger(__name__)
 
+# orjson serializes chat history several times faster; the stdlib json
+# fallback reads and writes the same format
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Gemini powers language detection and translation; without it messages are
+# treated by the script heuristic and answered untranslated
+try:
+    import google.generativeai as genai
+except ImportError:
+    genai = None
+
+def _dumps_history(chat_history) -> bytes:
+    """Serialize chat history to UTF-8 JSON bytes"""
+    if orjson is not None:
+        return orjson.dumps(chat_history)
+    return json.dumps(chat_history, ensure_ascii=False).encode('utf-8')
+
+def _loads_history(data):
+    """Deserialize chat history stored by _dumps_history"""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+# Maximum number of case PDF links listed in a WhatsApp reply
+_WHATSAPP_MAX_PDF_LINKS = 5
+
+# Format of the pickled PDF metadata cache; bump whenever _normalize_doc_key
+# or the shape of the info dicts changes so stale caches are rebuilt
+_PDF_METADATA_CACHE_VERSION = 1
+
+# Language detection only looks at this many leading characters; the
+# script mix of a message is settled well before that
+_LANGUAGE_SAMPLE_CHARS = 512
+
+# Display names for the languages translated through English
+_LANGUAGE_NAMES = {
+    'ur': 'Urdu',
+    'sd': 'Sindhi',
+    'bl': 'Balochi'
+}
+
+# Longest text sent to a translation prompt
+_MAX_TRANSLATION_CHARS = 8000
+
+_TO_ENGLISH_PROMPT = """Translate this {language_name} legal query to English. Keep it concise and maintain the legal intent.
+
+{language_label} QUERY:
+{text}
+
+ENGLISH TRANSLATION (only the translation, nothing else):"""
+
+_FROM_ENGLISH_PROMPT = """Translate the following legal analysis from English to {language_name}. 
+Maintain all legal terminology accuracy and preserve the structure (headings, bullet points, etc.).
+Keep case citations in English but translate the rest.
+Be professional and formal in {language_name}.
+
+ENGLISH TEXT:
+{text}
+
+{language_label} TRANSLATION:"""
+
+# Response instruction for English queries
+_ENGLISH_INSTRUCTION = "Respond in clear, professional English."
+
+# Response instructions per language code
+_LANGUAGE_INSTRUCTIONS = {
+    'ur': ("IMPORTANT: The user's query is in Urdu/Arabic. "
+           "You MUST respond in Urdu/Arabic script. "
+           "Provide your entire legal analysis and response in Urdu language. "
+           "اردو میں جواب دیں۔"),
+    'sd': ("IMPORTANT: The user's query is in Sindhi. "
+           "You MUST respond in Sindhi language using Arabic script. "
+           "Provide your entire legal analysis and response in Sindhi. "
+           "سنڌي ۾ جواب ڏيو۔"),
+    'bl': ("IMPORTANT: The user's query is in Balochi. "
+           "You MUST respond in Balochi language using Arabic script. "
+           "Provide your entire legal analysis and response in Balochi. "
+           "بلوچی ۾ جواب ڏيو۔"),
+    'en': _ENGLISH_INSTRUCTION
+}
+
+# Language names returned by the detection prompt
+_LANGUAGE_CODES = {
+    'ENGLISH': 'en',
+    'URDU': 'ur',
+    'SINDHI': 'sd',
+    'BALOCHI': 'bl'
+}
+
+# Language classification plus query translation in one Gemini call
+_DETECT_AND_TRANSLATE_PROMPT = """Analyze this text and determine the primary language being used.
+
+TEXT TO ANALYZE: "{sample}"
+
+LANGUAGE CLASSIFICATION TASK:
+- If the text is primarily in ENGLISH, respond with "ENGLISH"
+- If the text is primarily in URDU (even if mixed with English), respond with "URDU"
+- If the text is primarily in SINDHI (even if mixed with English), respond with "SINDHI"
+- If the text is primarily in BALOCHI (even if mixed with English), respond with "BALOCHI"
+
+CONSIDER:
+1. Script: Urdu/Sindhi/Balochi use Arabic script, English uses Latin
+2. Context: Legal questions about Pakistan often indicate Urdu unless specified otherwise
+3. Keywords: Look for language-specific terms, place names, or cultural references
+4. Mixing: If text has both scripts, prioritize the non-English script
+5. Linguistic patterns: Consider grammar, vocabulary, and sentence structure unique to each language
+
+EXAMPLES:
+- "What are tenant rights in Pakistan?" → ENGLISH
+- "کیا کرایہ دار کے حقوق کیا ہیں؟" → URDU
+- "ڪراچي ۾ ڪرائيدار جا حق ڇا آهن؟" → SINDHI
+- "کِرایِداراں کے کَے حُقُوق ءَنت؟" → BALOCHI
+- "Tell me about divorce laws in Urdu" → URDU (explicitly requested)
+- "سنڌي قانون بابت بتاؤ" → SINDHI
+- "بلوچی میں طلاق کے قوانین" → BALOCHI
+- "Property dispute in Karachi" → ENGLISH (but context suggests Urdu response might be preferred)
+- "میرا گھر چھین لیا گیا ہے" → URDU
+- "مون کي گهر کسي چوري ڪري ورتو" → SINDHI
+- "مور گَر چوری ڪَت گئی" → BALOCHI
+
+TRANSLATION TASK:
+If the language is not ENGLISH, translate the full query below to English. Keep it concise and maintain the legal intent.
+
+FULL QUERY:
+{text}
+
+Respond with ONLY a JSON object of the form:
+{{"language": "ENGLISH" | "URDU" | "SINDHI" | "BALOCHI", "english_query": "<English translation, or empty if ENGLISH>"}}"""
+
+# Runs of Arabic-script characters (Arabic and Arabic Supplement blocks)
+_ARABIC_SCRIPT_RE = re.compile(r'[\u0600-\u06FF\u0750-\u077F]+')
+
+def _normalize_doc_key(name: str) -> str:
+    """Normalize a case number, filename or document name for PDF metadata lookup"""
+    return name.strip().lower().removesuffix('.txt').removesuffix('.pdf').strip()
+
 class LawYaarWhatsAppService:
     """Service to handle WhatsApp messages using LawYaar's legal RAG system"""
     
     def __init__(self):
         """Initialize the service with LawYaar's vector database"""
+        whatsapp_config = get_whatsapp_config()
+        
+        # Gemini model for language detection and translation, configured once
+        self._gen_model = self._create_gemini_model()
+        # Gemini calls run in worker threads of different event loops, so the
+        # concurrency limit is a thread semaphore rather than an asyncio one
+        self._gemini_slots = threading.BoundedSemaphore(whatsapp_config.GEMINI_MAX_CONCURRENCY)
+        self._ascii_is_english = whatsapp_config.ASCII_IS_ENGLISH
+        
         try:
             # Initialize vector database (from your LawYaar system)
             logger.info("Initializing LawYaar vector database for WhatsApp...")
@@ -32,31 +193,219 @@ class LawYaarWhatsAppService:
             self.vector_db.create_or_get_collection(vdb_config.COLLECTION_NAME)
             logger.info("LawYaar vector database initialized successfully")
             
-            # Store conversation history per WhatsApp user
-            self.conversation_db = "lawyaar_whatsapp_chats_db"
-            
-            # Load PDF metadata for linking
-            self.pdf_metadata = self._load_pdf_metadata()
-            logger.info(f"Loaded {len(self.pdf_metadata)} PDF entries from metadata")
+            # The research flow is built once and shared by all requests. Nodes
+            # keep no per-run state and pocketflow runs copies of them, so
+            # concurrent run_async calls only share the (per-request) shared dict
+            self._online_flow = create_online_research_flow()
+            
+            # Store conversation history (and translations) in SQLite; one
+            # connection is shared by all requests, serialized by _conn_lock
+            self.conversation_db = "lawyaar_whatsapp_chats.db"
+            self._conn_lock = threading.Lock()
+            self._conn = self._open_conversation_db(self.conversation_db)
+            
+            # LRU of recent users' history so back-to-back messages from the
+            # same user skip the database read. Writes are applied to the cache
+            # immediately and persisted in batches by a background writer
+            self._history_cache = OrderedDict()
+            self._history_cache_size = whatsapp_config.HISTORY_CACHE_SIZE
+            self._history_max_messages = whatsapp_config.HISTORY_MAX_MESSAGES
+            self._speculative_research = whatsapp_config.SPECULATIVE_ENGLISH_RESEARCH
+            self._pending_writes = {}  # wa_id -> latest history not yet in SQLite
+            self._write_event = threading.Event()
+            self._chat_writer = threading.Thread(target=self._chat_writer_loop, name="chat-history-writer", daemon=True)
+            self._chat_writer.start()
+            atexit.register(self.flush_chats)
+            
+            # Answers to recent search queries, keyed by query embedding
+            self._sem_cache = SemanticQueryCache(
+                capacity=whatsapp_config.SEMANTIC_CACHE_SIZE,
+                threshold=whatsapp_config.SEMANTIC_CACHE_THRESHOLD
+            )
+            
+            # Query embeddings for cache lookups are computed in micro-batches so
+            # a burst of messages shares one encoder call
+            self._embedding_batcher = MicroBatcher(
+                self.vector_db.embed_queries,
+                max_batch_size=whatsapp_config.EMBED_BATCH_SIZE,
+                max_wait=whatsapp_config.EMBED_BATCH_WINDOW,
+                name="query-embedding-batcher"
+            )
+            
+            # Vector searches from concurrent requests go to ChromaDB as one
+            # multi-query call; results are handed to the flow's retrieval node
+            self._retrieval_batcher = MicroBatcher(
+                self._run_batched_retrieval,
+                max_batch_size=whatsapp_config.RETRIEVAL_BATCH_SIZE,
+                max_wait=whatsapp_config.RETRIEVAL_BATCH_WINDOW,
+                name="retrieval-batcher"
+            )
+            
+            # Research runs in progress, keyed by normalized query and language,
+            # so identical concurrent questions share one flow run. Futures are
+            # thread-safe because callers may run on different event loops
+            self._inflight = {}
+            self._inflight_lock = threading.Lock()
+            
+            # Successful translations keyed by direction, language and text hash;
+            # misses fall back to the persistent translations table. The TTL
+            # applies to both, counted from when Gemini produced the translation
+            self._translation_ttl = whatsapp_config.TRANSLATION_CACHE_TTL
+            self._translation_cache = TTLCache(
+                maxsize=whatsapp_config.TRANSLATION_CACHE_SIZE,
+                ttl=self._translation_ttl
+            )
+            # Expired rows are skipped on read; drop them once at startup
+            with self._conn_lock:
+                self._conn.execute(
+                    "DELETE FROM translations WHERE created_at <= ?", (time.time() - self._translation_ttl,)
+                )
+            
+            # Gemini detection results keyed by a hash of the message text
+            self._language_cache = TTLCache(
+                maxsize=whatsapp_config.LANGUAGE_CACHE_SIZE,
+                ttl=whatsapp_config.LANGUAGE_CACHE_TTL
+            )
             
         except Exception as e:
             logger.error(f"Error initializing LawYaar WhatsApp service: {e}")
             self.vector_db = None
             self.pdf_metadata = {}
     
+    def _create_gemini_model(self):
+        """
+        Configure the Gemini SDK and create the shared model
+        
+        Returns:
+            GenerativeModel instance, or None if Gemini is unavailable
+        """
+        if genai is None:
+            logger.error("google-generativeai not installed - language detection and translation disabled")
+            return None
+        
+        gemini_api_key = os.getenv('GEMINI_API_KEY')
+        if not gemini_api_key:
+            logger.error("GEMINI_API_KEY not found - language detection and translation disabled")
+            return None
+        
+        try:
+            genai.configure(api_key=gemini_api_key)
+            return genai.GenerativeModel('gemini-2.5-flash')
+        except Exception as e:
+            logger.error(f"Error initializing Gemini model: {e}")
+            return None
+    
+    def _generate_content(self, prompt: str, **kwargs):
+        """
+        Call Gemini, waiting for a free slot when GEMINI_MAX_CONCURRENCY calls are in flight
+        
+        Blocking; call from a worker thread.
+        
+        Args:
+            prompt: Prompt text
+            **kwargs: Passed through to GenerativeModel.generate_content
+            
+        Returns:
+            Gemini response
+        """
+        with self._gemini_slots:
+            return self._gen_model.generate_content(prompt, **kwargs)
+    
+    def _open_conversation_db(self, path):
+        """
+        Open the long-lived SQLite connection used for chat history and translations
+        
+        Args:
+            path: Path to the SQLite database file
+            
+        Returns:
+            sqlite3.Connection in autocommit mode with WAL enabled
+        """
+        conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("CREATE TABLE IF NOT EXISTS chats (wa_id TEXT PRIMARY KEY, history BLOB)")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS translations (hash BLOB PRIMARY KEY, tgt_lang TEXT, text TEXT, created_at REAL)"
+        )
+        return conn
+    
     def check_if_chat_exists(self, wa_id):
         """Check if a chat session exists for this WhatsApp ID"""
-        with shelve.open(self.conversation_db) as chats_shelf:
-            return chats_shelf.get(wa_id, None)
+        with self._conn_lock:
+            if wa_id in self._history_cache:
+                self._history_cache.move_to_end(wa_id)
+                return self._history_cache[wa_id]
+            
+            # Evicted from the LRU but not yet persisted
+            if wa_id in self._pending_writes:
+                chat_history = self._pending_writes[wa_id]
+                self._cache_history(wa_id, chat_history)
+                return chat_history
+            
+            row = self._conn.execute("SELECT history FROM chats WHERE wa_id = ?", (wa_id,)).fetchone()
+            chat_history = _loads_history(row[0]) if row else None
+            self._cache_history(wa_id, chat_history)
+            return chat_history
     
     def store_chat(self, wa_id, chat_history):
-        """Store chat history for a WhatsApp ID"""
-        with shelve.open(self.conversation_db, writeback=True) as chats_shelf:
-            chats_shelf[wa_id] = chat_history
+        """Store chat history for a WhatsApp ID (persisted asynchronously by the writer thread)"""
+        with self._conn_lock:
+            self._cache_history(wa_id, chat_history)
+            self._pending_writes[wa_id] = chat_history
+        self._write_event.set()
+    
+    def flush_chats(self):
+        """Write all pending chat histories to SQLite in one transaction"""
+        with self._conn_lock:
+            if not self._pending_writes:
+                return
+            rows = [(wa_id, _dumps_history(history)) for wa_id, history in self._pending_writes.items()]
+            # Pending entries are only dropped once committed, so readers never
+            # fall through to a stale row
+            self._conn.execute("BEGIN")
+            try:
+                self._conn.executemany("INSERT OR REPLACE INTO chats (wa_id, history) VALUES (?, ?)", rows)
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._pending_writes.clear()
+    
+    def _chat_writer_loop(self):
+        """Background loop persisting chat histories queued by store_chat"""
+        while True:
+            self._write_event.wait()
+            self._write_event.clear()
+            try:
+                self.flush_chats()
+            except Exception as e:
+                logger.error(f"Error persisting chat history: {e}")
+    
+    def _cache_history(self, wa_id, chat_history):
+        """Insert into the history LRU, evicting the least recent user (must be called with _conn_lock held)"""
+        self._history_cache[wa_id] = chat_history
+        self._history_cache.move_to_end(wa_id)
+        if len(self._history_cache) > self._history_cache_size:
+            self._history_cache.popitem(last=False)
+    
+    @functools.cached_property
+    def pdf_metadata(self):
+        """PDF metadata for linking, loaded on first use"""
+        pdf_map = self._load_pdf_metadata()
+        logger.info(f"Loaded {len(pdf_map)} PDF entries from metadata")
+        return pdf_map
     
     def _load_pdf_metadata(self):
-        """Load PDF URLs from metadata.csv"""
+        """
+        Load PDF URLs from metadata.csv
+        
+        The parsed map is pickled next to the CSV and reused while it is at
+        least as new as the CSV and has the current cache format version, so
+        restarts skip parsing.
+        """
         metadata_path = Path(__file__).parent / "scraper" / "metadata.csv"
+        cache_path = metadata_path.with_suffix('.pkl')
         pdf_map = {}
         
         try:
@@ -64,53 +413,92 @@ class LawYaarWhatsAppService:
                 logger.warning(f"Metadata file not found: {metadata_path}")
                 return pdf_map
             
-            with open(metadata_path, 'r', encoding='utf-8') as f:
-                reader = csv.DictReader(f)
+            # Nanosecond mtimes so a CSV rewritten within the same second as
+            # the cache is still detected as newer
+            csv_mtime = metadata_path.stat().st_mtime_ns
+            try:
+                if cache_path.stat().st_mtime_ns >= csv_mtime:
+                    with open(cache_path, 'rb') as f:
+                        cached = pickle.load(f)
+                    if isinstance(cached, dict) and cached.get('version') == _PDF_METADATA_CACHE_VERSION:
+                        return cached['pdf_map']
+                    logger.info("PDF metadata cache has an old format - rebuilding")
+            except FileNotFoundError:
+                pass
+            except Exception as e:
+                logger.warning(f"Ignoring unreadable PDF metadata cache {cache_path}: {e}")
+            
+            with open(metadata_path, 'r', encoding='utf-8', newline='') as f:
+                # Plain rows indexed by header position; no per-row dict
+                reader = csv.reader(f)
+                header = next(reader, [])
+                case_no_idx = header.index('Case_No')
+                filename_idx = header.index('Filename')
+                pdf_url_idx = header.index('PDF_URL')
+                case_title_idx = header.index('Case_Title')
+                min_len = max(case_no_idx, filename_idx, pdf_url_idx, case_title_idx) + 1
+                
                 for row in reader:
-                    case_no = row.get('Case_No', '').strip()
-                    filename = row.get('Filename', '').strip()
-                    pdf_url = row.get('PDF_URL', '').strip()
-                    case_title = row.get('Case_Title', '').strip()
-                    
-                    if case_no and pdf_url:
-                        # Map both case number and filename to PDF info
-                        pdf_map[case_no] = {'url': pdf_url, 'title': case_title, 'case_no': case_no}
-                        if filename:
-                            # Remove .txt extension if present
-                            base_filename = filename.replace('.txt', '').replace('.pdf', '')
-                            pdf_map[base_filename] = {'url': pdf_url, 'title': case_title, 'case_no': case_no}
-            
+                    if len(row) < min_len:
+                        continue
+                    case_no = row[case_no_idx].strip()
+                    pdf_url = row[pdf_url_idx].strip()
+                    if not (case_no and pdf_url):
+                        continue
+                    filename = row[filename_idx].strip()
+                    case_title = row[case_title_idx].strip()
+                    # Map both case number and filename to one shared PDF info
+                    # entry, under normalized keys (see _normalize_doc_key)
+                    pdf_info = {'url': pdf_url, 'title': case_title, 'case_no': case_no}
+                    pdf_map[_normalize_doc_key(case_no)] = pdf_info
+                    if filename:
+                        pdf_map.setdefault(_normalize_doc_key(filename), pdf_info)
+            
+            self._write_pdf_metadata_cache(cache_path, pdf_map)
             return pdf_map
             
         except Exception as e:
             logger.error(f"Error loading PDF metadata: {e}")
             return pdf_map
     
+    def _write_pdf_metadata_cache(self, cache_path: Path, pdf_map: dict):
+        """Atomically write the parsed PDF metadata cache (failures are only logged)"""
+        tmp_path = cache_path.with_name(f"{cache_path.name}.{os.getpid()}.tmp")
+        try:
+            with open(tmp_path, 'wb') as f:
+                pickle.dump(
+                    {'version': _PDF_METADATA_CACHE_VERSION, 'pdf_map': pdf_map},
+                    f, protocol=pickle.HIGHEST_PROTOCOL
+                )
+            os.replace(tmp_path, cache_path)
+        except Exception as e:
+            logger.warning(f"Could not write PDF metadata cache {cache_path}: {e}")
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+    
     def _get_pdf_links_for_documents(self, document_names: list) -> list:
-        """Get PDF URLs for the given document names"""
-        pdf_links = []
-        seen_urls = set()
+        """
+        Get PDF URLs for the given document names
+        
+        Args:
+            document_names: Document names to look up, in priority order
+            
+        Returns:
+            list: PDF info dicts, one per case, in first-seen order
+        """
+        # Case number and filename keys share one info dict, so deduplicate
+        # on case_no; every metadata entry has a URL
+        pdf_links = {}
+        pdf_metadata = self.pdf_metadata
         
         for doc_name in document_names:
-            # Try exact match first
-            if doc_name in self.pdf_metadata:
-                pdf_info = self.pdf_metadata[doc_name]
-                url = pdf_info['url']
-                if url and url not in seen_urls:
-                    pdf_links.append(pdf_info)
-                    seen_urls.add(url)
-                continue
-            
-            # Try partial match (remove .txt extension)
-            base_name = doc_name.replace('.txt', '').replace('.pdf', '')
-            if base_name in self.pdf_metadata:
-                pdf_info = self.pdf_metadata[base_name]
-                url = pdf_info['url']
-                if url and url not in seen_urls:
-                    pdf_links.append(pdf_info)
-                    seen_urls.add(url)
-        
-        return pdf_links
+            pdf_info = pdf_metadata.get(_normalize_doc_key(doc_name))
+            if pdf_info:
+                pdf_links.setdefault(pdf_info['case_no'], pdf_info)
+        
+        return list(pdf_links.values())
     
     async def generate_legal_response(self, message_body: str, wa_id: str, name: str, return_metadata: bool = False):
         """
@@ -133,22 +521,28 @@ class LawYaarWhatsAppService:
                 return ("I apologize, but the legal research database is currently unavailable. "
                        "Please try again later or contact support.")
             
-            # Retrieve chat history (for context)
+            # Detect language, create instruction for same-language response and
+            # translate the query, all in one Gemini call. It runs in a worker
+            # thread so the history lookup below overlaps with it instead of
+            # blocking the event loop
+            detection_task = asyncio.create_task(
+                asyncio.to_thread(self._detect_and_translate, message_body)
+            )
+            
+            # Most queries are English, so research can optionally start before
+            # detection finishes. Messages containing Arabic script are never
+            # speculated on
+            speculative_task = None
+            if self._speculative_research and not _ARABIC_SCRIPT_RE.search(message_body):
+                speculative_task = asyncio.create_task(
+                    self._research(message_body, _ENGLISH_INSTRUCTION, 'en')
+                )
+            
+            # Retrieve chat history (appended to and stored after the response).
+            # It is not passed to the research flow, so no context string is built
             chat_history = self.check_if_chat_exists(wa_id)
             
-            # Build context from previous conversation if available
-            conversation_context = ""
-            if chat_history:
-                # Get last 3 exchanges for context
-                recent_history = chat_history[-6:] if len(chat_history) > 6 else chat_history
-                conversation_context = "\n".join([
-                    f"{'User' if i % 2 == 0 else 'Assistant'}: {msg.get('parts', [''])[0][:200]}"
-                    for i, msg in enumerate(recent_history)
-                ])
-                logger.info(f"Using conversation context for {name}")
-            
-            # Detect language and create instruction for same-language response
-            detected_language, language_instruction = self._detect_language_and_create_instruction(message_body)
+            detected_language, language_instruction, english_query = await detection_task
             
             # Log language detection
             logger.info("="*80)
@@ -163,7 +557,8 @@ class LawYaarWhatsAppService:
             if detected_language in ['ur', 'sd', 'bl']:
                 logger.info(f"✅ {detected_language.upper()} detected - will translate for vector search")
                 logger.info(f"Original {detected_language} query: {message_body[:100]}")
-                search_query = await self._translate_to_english(message_body, detected_language)
+                # Only a separate call if detection could not translate
+                search_query = english_query or await self._translate_to_english(message_body, detected_language)
                 logger.info(f"✅ English translation for search: {search_query}")
                 logger.info(f"Translation success: Query will be searched in English")
             else:
@@ -172,28 +567,15 @@ class LawYaarWhatsAppService:
             
             logger.info("="*80)
             
-            # Create shared state for LawYaar research flow
-            shared = {
-                "user_query": search_query,  # Use translated query for vector search
-                "language_instruction": language_instruction,  # Add language instruction
-                "vector_db": self.vector_db,
-                "retrieved_chunks": [],
-                "retrieval_count": 0,
-                "unique_documents": [],
-                "unique_document_count": 0,
-                "processed_documents": [],
-                "successful_documents": [],
-                "failed_documents": [],
-                "final_response": ""
-            }
-            
-            # Run the LawYaar online research flow
-            logger.info("Running LawYaar legal research flow...")
-            online_flow = create_online_research_flow()
-            await online_flow.run_async(shared)
-            
-            # Extract the response
-            final_response = shared.get("final_response", "")
+            if speculative_task is not None and detected_language == 'en':
+                final_response, successful_docs = await speculative_task
+            else:
+                if speculative_task is not None:
+                    logger.info("Discarding speculative English research")
+                    speculative_task.cancel()
+                final_response, successful_docs = await self._research(
+                    search_query, language_instruction, detected_language
+                )
             
             if not final_response:
                 logger.warning("LawYaar flow returned empty response")
@@ -204,14 +586,12 @@ class LawYaarWhatsAppService:
                     empty_response = await self._translate_to_target_language(empty_response, detected_language)
                 return empty_response
             
-            # Get PDF links for successful documents (new field name)
-            successful_docs = shared.get("successful_documents", [])
             # Extract doc_id from processed documents
             doc_names = [doc.get('doc_id', '') for doc in successful_docs]
-            pdf_links = self._get_pdf_links_for_documents(doc_names)
             
             # If return_metadata is True, return dict with full response and metadata
             if return_metadata:
+                pdf_links = self._get_pdf_links_for_documents(doc_names)
                 return {
                     "full_legal_response": final_response,
                     "relevant_documents": doc_names,  # Keep same key for backward compatibility
@@ -226,13 +606,21 @@ class LawYaarWhatsAppService:
                 logger.info(f"Detected {detected_language} input - translating response to {detected_language}...")
                 final_response = await self._translate_to_target_language(final_response, detected_language)
             
-            # Format response for WhatsApp (keep it concise)
-            whatsapp_response = self._format_for_whatsapp(final_response, shared, pdf_links)
-            
-            # Update conversation history
-            new_history = chat_history if chat_history else []
-            new_history.append({"role": "user", "parts": [message_body]})
-            new_history.append({"role": "model", "parts": [whatsapp_response]})
+            # Format response for WhatsApp (keep it concise). All links are
+            # looked up so the reply can say how many did not fit
+            pdf_links = self._get_pdf_links_for_documents(doc_names)
+            whatsapp_response = self._format_for_whatsapp(final_response, {"successful_documents": successful_docs}, pdf_links)
+            
+            # Update conversation history. Build a new list so the cached one is
+            # replaced, never mutated in place, and keep only the most recent
+            # messages so each store rewrites a bounded blob
+            chat_history = chat_history or []
+            keep = max(self._history_max_messages - 2, 0)
+            new_history = chat_history[max(len(chat_history) - keep, 0):] if keep else []
+            new_history += [
+                {"role": "user", "parts": [message_body]},
+                {"role": "model", "parts": [whatsapp_response]}
+            ]
             self.store_chat(wa_id, new_history)
             
             logger.info(f"Generated legal response for {name} (length: {len(whatsapp_response)} chars)")
@@ -255,99 +643,232 @@ class LawYaarWhatsAppService:
             
             return error_message
     
-    def _detect_language_and_create_instruction(self, text: str) -> tuple[str, str]:
+    async def _research(self, search_query: str, language_instruction: str, detected_language: str) -> tuple[str, list]:
+        """
+        Answer an (English) search query, from the semantic cache or the research flow
+        
+        Args:
+            search_query: English query used for vector search
+            language_instruction: Response-language instruction for the flow
+            detected_language: Language code the answer is cached under
+            
+        Returns:
+            tuple: (final_response, successful_documents); final_response is empty if the flow produced nothing
+        """
+        # Near-duplicate questions in the same language reuse the cached answer
+        # and skip the research flow entirely
+        query_embedding = await asyncio.wrap_future(self._embedding_batcher.submit(search_query))
+        cached = self._sem_cache.lookup(query_embedding, namespace=detected_language)
+        if cached is not None:
+            return cached
+        
+        key = hashlib.blake2b(
+            f"{detected_language}:{search_query.strip().lower()}".encode('utf-8'), digest_size=16
+        ).hexdigest()
+        while True:
+            with self._inflight_lock:
+                future = self._inflight.get(key)
+                if future is None:
+                    future = self._inflight[key] = Future()
+                    break
+            
+            logger.info("Identical query already being researched - waiting for its result")
+            try:
+                # Shielded so cancelling this waiter doesn't cancel the shared future
+                return await asyncio.shield(asyncio.wrap_future(future))
+            except asyncio.CancelledError:
+                # The leading request was cancelled (e.g. discarded speculation);
+                # take over unless this request was cancelled as well
+                if future.cancelled() and not asyncio.current_task().cancelling():
+                    continue
+                raise
+        
+        try:
+            result = await self._run_research_flow(search_query, language_instruction)
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as e:
+            if not future.done():
+                future.set_exception(e)
+            raise
+        else:
+            if result[0]:
+                self._sem_cache.insert(query_embedding, result, namespace=detected_language)
+            if not future.done():
+                future.set_result(result)
+            return result
+        finally:
+            with self._inflight_lock:
+                self._inflight.pop(key, None)
+    
+    async def _run_research_flow(self, search_query: str, language_instruction: str) -> tuple[str, list]:
+        """
+        Run the online research flow for one query
+        
+        Args:
+            search_query: English query used for vector search
+            language_instruction: Response-language instruction for the flow
+            
+        Returns:
+            tuple: (final_response, successful_documents)
+        """
+        prefetched_chunks = await asyncio.wrap_future(self._retrieval_batcher.submit(search_query))
+        
+        # Create shared state for LawYaar research flow
+        shared = {
+            "user_query": search_query,  # Use translated query for vector search
+            "language_instruction": language_instruction,  # Add language instruction
+            "vector_db": self.vector_db,
+            "prefetched_chunks": prefetched_chunks,  # InitialRetrievalNode skips its own search
+            "retrieved_chunks": [],
+            "retrieval_count": 0,
+            "unique_documents": [],
+            "unique_document_count": 0,
+            "processed_documents": [],
+            "successful_documents": [],
+            "failed_documents": [],
+            "final_response": ""
+        }
+        
+        # Run the LawYaar online research flow
+        logger.info("Running LawYaar legal research flow...")
+        await self._online_flow.run_async(shared)
+        
+        # Extract the response and the successful documents (new field name)
+        return shared.get("final_response", ""), shared.get("successful_documents", [])
+    
+    def _run_batched_retrieval(self, queries: list) -> list:
         """
-        Detect the language of input text and create instruction to respond in same language.
+        Vector search for a batch of queries (called by the retrieval batcher)
+        
+        Args:
+            queries: English search queries
+            
+        Returns:
+            list: Retrieved chunks for each query, in the same order
+        """
+        vdb_config = get_vector_db_config()
+        return self.vector_db.search_batch(
+            queries,
+            n_results=vdb_config.MAX_RESULTS,
+            similarity_threshold=vdb_config.SIMILARITY_THRESHOLD
+        )
+    
+    def _detect_and_translate(self, text: str) -> tuple[str, str, str]:
+        """
+        Detect the language of input text and, if it is not English, translate it for vector search.
+        
+        Both are done in a single Gemini call returning JSON; without Gemini
+        (or if the call fails) the language is guessed from the script and no
+        translation is returned.
 
         Args:
             text: Input text to detect language
 
         Returns:
-            tuple: (language_code, instruction) where language_code is 'ur' for Urdu, 'sd' for Sindhi, 'bl' for Balochi, or 'en' for English
+            tuple: (language_code, instruction, english_query) where language_code is 'ur' for Urdu, 'sd' for Sindhi,
+            'bl' for Balochi, or 'en' for English, and english_query is None if no translation is available
         """
-        # Use LLM for intelligent detection
+        # Pure-ASCII text has no Urdu/Sindhi/Balochi script to detect or translate
+        if self._ascii_is_english and text.isascii():
+            return ('en', _ENGLISH_INSTRUCTION, text)
+        
+        sample = text[:_LANGUAGE_SAMPLE_CHARS]
+        
+        # Repeated messages (greetings, FAQ questions) skip the Gemini call
+        cache_key = hashlib.blake2b(text.encode('utf-8'), digest_size=12).digest()
+        cached = self._language_cache.get(cache_key)
+        if cached is not None:
+            return cached
+        
+        # Use LLM for intelligent detection and translation
         try:
-            import google.generativeai as genai
-            import os
-
-            gemini_api_key = os.getenv('GEMINI_API_KEY')
-            if gemini_api_key:
-                genai.configure(api_key=gemini_api_key)
-                model = genai.GenerativeModel('gemini-2.5-flash')
-
-                detection_prompt = f"""Analyze this text and determine the primary language being used.
-
-TEXT TO ANALYZE: "{text}"
-
-LANGUAGE CLASSIFICATION TASK:
-- If the text is primarily in ENGLISH, respond with "ENGLISH"
-- If the text is primarily in URDU (even if mixed with English), respond with "URDU"
-- If the text is primarily in SINDHI (even if mixed with English), respond with "SINDHI"
-- If the text is primarily in BALOCHI (even if mixed with English), respond with "BALOCHI"
-
-CONSIDER:
-1. Script: Urdu/Sindhi/Balochi use Arabic script, English uses Latin
-2. Context: Legal questions about Pakistan often indicate Urdu unless specified otherwise
-3. Keywords: Look for language-specific terms, place names, or cultural references
-4. Mixing: If text has both scripts, prioritize the non-English script
-5. Linguistic patterns: Consider grammar, vocabulary, and sentence structure unique to each language
-
-EXAMPLES:
-- "What are tenant rights in Pakistan?" → ENGLISH
-- "کیا کرایہ دار کے حقوق کیا ہیں؟" → URDU
-- "ڪراچي ۾ ڪرائيدار جا حق ڇا آهن؟" → SINDHI
-- "کِرایِداراں کے کَے حُقُوق ءَنت؟" → BALOCHI
-- "Tell me about divorce laws in Urdu" → URDU (explicitly requested)
-- "سنڌي قانون بابت بتاؤ" → SINDHI
-- "بلوچی میں طلاق کے قوانین" → BALOCHI
-- "Property dispute in Karachi" → ENGLISH (but context suggests Urdu response might be preferred)
-- "میرا گھر چھین لیا گیا ہے" → URDU
-- "مون کي گهر کسي چوري ڪري ورتو" → SINDHI
-- "مور گَر چوری ڪَت گئی" → BALOCHI
-
-Respond with ONLY ONE WORD: "ENGLISH", "URDU", "SINDHI", or "BALOCHI"
-
-DETECTED LANGUAGE:"""
-
-                response = model.generate_content(detection_prompt)
-                result = response.text.strip().upper()
-
-                # Map LLM response to our codes and instructions
-                if "URDU" in result:
-                    return ('ur',
-                           "IMPORTANT: The user's query is in Urdu/Arabic. "
-                           "You MUST respond in Urdu/Arabic script. "
-                           "Provide your entire legal analysis and response in Urdu language. "
-                           "اردو میں جواب دیں۔")
-                elif "SINDHI" in result:
-                    return ('sd',
-                           "IMPORTANT: The user's query is in Sindhi. "
-                           "You MUST respond in Sindhi language using Arabic script. "
-                           "Provide your entire legal analysis and response in Sindhi. "
-                           "سنڌي ۾ جواب ڏيو۔")
-                elif "BALOCHI" in result:
-                    return ('bl',
-                           "IMPORTANT: The user's query is in Balochi. "
-                           "You MUST respond in Balochi language using Arabic script. "
-                           "Provide your entire legal analysis and response in Balochi. "
-                           "بلوچی ۾ جواب ڏيو۔")
-                elif "ENGLISH" in result:
-                    return ('en', "Respond in clear, professional English.")
+            if self._gen_model is not None:
+                prompt = _DETECT_AND_TRANSLATE_PROMPT.format(
+                    sample=sample,
+                    text=text.strip()[:_MAX_TRANSLATION_CHARS]
+                )
+                response = self._generate_content(
+                    prompt,
+                    generation_config={"response_mime_type": "application/json"}
+                )
+                result = json.loads(response.text)
+                language = _LANGUAGE_CODES.get(str(result.get('language', '')).strip().upper())
+                
+                if language == 'en':
+                    detection = ('en', _ENGLISH_INSTRUCTION, text)
+                    self._language_cache.set(cache_key, detection)
+                    return detection
+                if language is not None:
+                    english_query = (result.get('english_query') or '').strip() or None
+                    if english_query:
+                        self._store_translation(self._translation_cache_key('to_en', language, text), 'en', english_query)
+                    detection = (language, _LANGUAGE_INSTRUCTIONS[language], english_query)
+                    self._language_cache.set(cache_key, detection)
+                    return detection
         except Exception as e:
             logger.warning(f"LLM language detection failed: {e}, falling back to script detection")
 
-        # Fallback: Simple heuristic: check for Urdu/Arabic script characters
-        urdu_arabic_chars = sum(1 for char in text if '\u0600' <= char <= '\u06FF' or '\u0750' <= char <= '\u077F')
+        # Fallback: Simple heuristic: check for Urdu/Arabic script characters.
+        # Not cached, so Gemini is retried once it is reachable again
+        urdu_arabic_chars = sum(map(len, _ARABIC_SCRIPT_RE.findall(sample)))
 
-        if urdu_arabic_chars > len(text) * 0.2:  # If more than 20% Urdu/Arabic characters
-            return ('ur',
-                   "IMPORTANT: The user's query is in Urdu/Arabic. "
-                   "You MUST respond in Urdu/Arabic script. "
-                   "Provide your entire legal analysis and response in Urdu language. "
-                   "اردو میں جواب دیں۔")
+        if urdu_arabic_chars > len(sample) * 0.2:  # If more than 20% Urdu/Arabic characters
+            return ('ur', _LANGUAGE_INSTRUCTIONS['ur'], None)
         else:
             # Default to English
-            return ('en', "Respond in clear, professional English.")
+            return ('en', _ENGLISH_INSTRUCTION, text)
+    
+    @staticmethod
+    def _translation_cache_key(direction: str, language: str, text: str) -> bytes:
+        """Build the translation cache key; the text is hashed so long inputs make short keys"""
+        return hashlib.blake2b(f"{direction}:{language}:{text}".encode('utf-8'), digest_size=16).digest()
+    
+    def _load_translation(self, cache_key: bytes):
+        """
+        Look up an unexpired translation in SQLite after an in-memory miss
+        
+        Blocking; call from a worker thread.
+        
+        Args:
+            cache_key: Key from _translation_cache_key
+            
+        Returns:
+            str: Stored translation, or None if missing or expired
+        """
+        now = time.time()
+        with self._conn_lock:
+            row = self._conn.execute(
+                "SELECT text, created_at FROM translations WHERE hash = ? AND created_at > ?",
+                (cache_key, now - self._translation_ttl)
+            ).fetchone()
+        if row is None:
+            return None
+        # Keep the in-memory copy only for the row's remaining lifetime
+        self._translation_cache.set(cache_key, row[0], ttl=row[1] + self._translation_ttl - now)
+        return row[0]
+    
+    def _store_translation(self, cache_key: bytes, target_language: str, translated_text: str):
+        """
+        Cache a translation in memory and persist it so it survives restarts
+        
+        Blocking; call from a worker thread.
+        
+        Args:
+            cache_key: Key from _translation_cache_key
+            target_language: Language code of the translated text
+            translated_text: Translation to store
+        """
+        self._translation_cache.set(cache_key, translated_text)
+        try:
+            with self._conn_lock:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO translations (hash, tgt_lang, text, created_at) VALUES (?, ?, ?, ?)",
+                    (cache_key, target_language, translated_text, time.time())
+                )
+        except Exception as e:
+            logger.warning(f"Could not persist translation: {e}")
     
     async def _translate_to_english(self, text: str, source_language: str) -> str:
         """
@@ -361,37 +882,31 @@ DETECTED LANGUAGE:"""
             str: Translated query in English
         """
         try:
-            import google.generativeai as genai
-            import os
-            
-            gemini_api_key = os.getenv('GEMINI_API_KEY')
-            if not gemini_api_key:
-                logger.error("GEMINI_API_KEY not found - cannot translate query")
+            if self._gen_model is None:
+                logger.error("Gemini model unavailable - cannot translate query")
                 return text  # Return original if can't translate
             
-            genai.configure(api_key=gemini_api_key)
-            model = genai.GenerativeModel('gemini-2.5-flash')
-            
-            language_names = {
-                'ur': 'Urdu',
-                'sd': 'Sindhi', 
-                'bl': 'Balochi'
-            }
-            
-            language_name = language_names.get(source_language, 'Urdu')
-            
-            translation_prompt = f"""Translate this {language_name} legal query to English. Keep it concise and maintain the legal intent.
-
-{language_name.upper()} QUERY:
-{text}
-
-ENGLISH TRANSLATION (only the translation, nothing else):"""
+            cache_key = self._translation_cache_key('to_en', source_language, text)
+            cached = self._translation_cache.get(cache_key)
+            if cached is None:
+                cached = await asyncio.to_thread(self._load_translation, cache_key)
+            if cached is not None:
+                logger.info(f"Using cached translation: {cached}")
+                return cached
+            
+            language_name = _LANGUAGE_NAMES.get(source_language, 'Urdu')
+            translation_prompt = _TO_ENGLISH_PROMPT.format(
+                language_name=language_name,
+                language_label=language_name.upper(),
+                text=text.strip()[:_MAX_TRANSLATION_CHARS]
+            )
             
             logger.info(f"Translating {language_name} query to English for vector search...")
-            response = model.generate_content(translation_prompt)
+            response = await asyncio.to_thread(self._generate_content, translation_prompt)
             english_text = response.text.strip()
             logger.info(f"Translated query: {english_text}")
             
+            await asyncio.to_thread(self._store_translation, cache_key, 'en', english_text)
             return english_text
             
         except Exception as e:
@@ -410,40 +925,31 @@ ENGLISH TRANSLATION (only the translation, nothing else):"""
             str: Translated text in target language
         """
         try:
-            import google.generativeai as genai
-            import os
-            
-            gemini_api_key = os.getenv('GEMINI_API_KEY')
-            if not gemini_api_key:
-                logger.error(f"GEMINI_API_KEY not found - cannot translate to {target_language}")
+            if self._gen_model is None:
+                logger.error(f"Gemini model unavailable - cannot translate to {target_language}")
                 return english_text  # Return original if can't translate
             
-            genai.configure(api_key=gemini_api_key)
-            model = genai.GenerativeModel('gemini-2.5-flash')
-            
-            language_names = {
-                'ur': 'Urdu',
-                'sd': 'Sindhi',
-                'bl': 'Balochi'
-            }
-            
-            language_name = language_names.get(target_language, 'Urdu')
-            
-            translation_prompt = f"""Translate the following legal analysis from English to {language_name}. 
-Maintain all legal terminology accuracy and preserve the structure (headings, bullet points, etc.).
-Keep case citations in English but translate the rest.
-Be professional and formal in {language_name}.
-
-ENGLISH TEXT:
-{english_text}
-
-{language_name.upper()} TRANSLATION:"""
+            cache_key = self._translation_cache_key('from_en', target_language, english_text)
+            cached = self._translation_cache.get(cache_key)
+            if cached is None:
+                cached = await asyncio.to_thread(self._load_translation, cache_key)
+            if cached is not None:
+                logger.info(f"Using cached {target_language} translation ({len(cached)} characters)")
+                return cached
+            
+            language_name = _LANGUAGE_NAMES.get(target_language, 'Urdu')
+            translation_prompt = _FROM_ENGLISH_PROMPT.format(
+                language_name=language_name,
+                language_label=language_name.upper(),
+                text=english_text.strip()[:_MAX_TRANSLATION_CHARS]
+            )
             
             logger.info(f"Translating legal response to {language_name}...")
-            response = model.generate_content(translation_prompt)
+            response = await asyncio.to_thread(self._generate_content, translation_prompt)
             translated_text = response.text.strip()
             
             logger.info(f"✅ Translation successful ({len(translated_text)} characters)")
+            await asyncio.to_thread(self._store_translation, cache_key, target_language, translated_text)
             return translated_text
             
         except Exception as e:
@@ -470,11 +976,13 @@ ENGLISH TEXT:
         max_length = 3500  # Leave room for PDF links
         
         if len(response) > max_length:
-            truncated = response[:max_length - 200]
-            # Try to end at a sentence
-            last_period = truncated.rfind('.')
-            if last_period > max_length - 500:
-                truncated = truncated[:last_period + 1]
+            # Try to end at a sentence: only the last 300 chars before the cut
+            # are searched, since an earlier period would be rejected anyway
+            cut = max_length - 200
+            last_period = response.rfind('.', max_length - 500 + 1, cut)
+            if last_period != -1:
+                cut = last_period + 1
+            truncated = response[:cut]
             
             response = (f"{truncated}\n\n"
                        f"_[Response truncated for WhatsApp. {doc_count} legal cases analyzed.]_")
@@ -486,24 +994,27 @@ ENGLISH TEXT:
         # Add PDF links section if available
         if pdf_links and len(pdf_links) > 0:
             response += "\n\n📄 *Full Case Documents:*\n"
-            for i, pdf_info in enumerate(pdf_links[:5], 1):  # Limit to 5 links
+            for i, pdf_info in enumerate(pdf_links[:_WHATSAPP_MAX_PDF_LINKS], 1):
                 case_no = pdf_info.get('case_no', 'Case')
                 url = pdf_info.get('url', '')
                 if url:
                     response += f"{i}. {case_no}: {url}\n"
             
-            if len(pdf_links) > 5:
-                response += f"\n_Plus {len(pdf_links) - 5} more case documents_"
+            if len(pdf_links) > _WHATSAPP_MAX_PDF_LINKS:
+                response += f"\n_Plus {len(pdf_links) - _WHATSAPP_MAX_PDF_LINKS} more case documents_"
         
         return response
 
 
 # Singleton instance
 _lawyaar_service = None
+_lawyaar_service_lock = threading.Lock()
 
 def get_lawyaar_whatsapp_service():
-    """Get or create the LawYaar WhatsApp service singleton"""
+    """Get or create the LawYaar WhatsApp service singleton (thread-safe)"""
     global _lawyaar_service
     if _lawyaar_service is None:
-        _lawyaar_service = LawYaarWhatsAppService()
+        with _lawyaar_service_lock:
+            if _lawyaar_service is None:
+                _lawyaar_service = LawYaarWhatsAppService()
     return _lawyaar_service
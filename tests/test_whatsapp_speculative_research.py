@@ -0,0 +1,95 @@
+"""
+Cancelling speculative English research must not wedge the shared batchers
+"""
+import asyncio
+import os
+import sys
+import threading
+
+import pytest
+
+pytest.importorskip("numpy")
+pytest.importorskip("chromadb")
+pytest.importorskip("torch")
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+from whatsapp_legal_service import LawYaarWhatsAppService, _LANGUAGE_INSTRUCTIONS
+from utils.micro_batcher import MicroBatcher
+from utils.semantic_cache import SemanticQueryCache
+
+
+class FakeVectorDB:
+    """Embeds queries by length and returns no chunks"""
+
+    def embed_queries(self, queries):
+        return [[float(len(query)), 1.0] for query in queries]
+
+    def search_batch(self, queries, n_results=10, similarity_threshold=0.5):
+        return [[] for _ in queries]
+
+
+class FakeFlow:
+    """Research flow that answers every query after a short delay"""
+
+    def __init__(self):
+        self.runs = 0
+
+    async def run_async(self, shared):
+        self.runs += 1
+        await asyncio.sleep(0.05)
+        shared["final_response"] = f"Answer to: {shared['user_query']}"
+        shared["successful_documents"] = []
+
+
+def make_service(detections):
+    """Build a service without Gemini, SQLite or ChromaDB"""
+    service = LawYaarWhatsAppService.__new__(LawYaarWhatsAppService)
+    service.vector_db = FakeVectorDB()
+    service.pdf_metadata = {}
+    service._online_flow = FakeFlow()
+    service._speculative_research = True
+    service._history_max_messages = 40
+    service._sem_cache = SemanticQueryCache(capacity=8, threshold=0.999)
+    # A long window keeps the speculative embedding queued when it is cancelled
+    service._embedding_batcher = MicroBatcher(service.vector_db.embed_queries, max_wait=0.2)
+    service._retrieval_batcher = MicroBatcher(service._run_batched_retrieval, max_wait=0.01)
+    service._inflight = {}
+    service._inflight_lock = threading.Lock()
+    service.check_if_chat_exists = lambda wa_id: None
+    service.store_chat = lambda wa_id, chat_history: None
+
+    def detect(text):
+        return detections[text]
+    service._detect_and_translate = detect
+
+    async def translate(text, target_language):
+        return text
+    service._translate_to_target_language = translate
+    return service
+
+
+def test_cancelled_speculation_does_not_block_next_request():
+    urdu_query = "kiraya dar ke huqooq"
+    english_query = "What are tenant rights?"
+    service = make_service({
+        urdu_query: ("ur", _LANGUAGE_INSTRUCTIONS["ur"], "tenant rights"),
+        english_query: ("en", "Respond in English.", english_query),
+    })
+
+    async def run():
+        # Detected as Urdu, so the speculative English run is cancelled
+        first = await asyncio.wait_for(
+            service.generate_legal_response(urdu_query, "1", "A"), timeout=5
+        )
+        second = await asyncio.wait_for(
+            service.generate_legal_response(english_query, "2", "B"), timeout=5
+        )
+        return first, second
+
+    first, second = asyncio.run(run())
+
+    assert "Answer to: tenant rights" in first
+    assert f"Answer to: {english_query}" in second
+    assert service._embedding_batcher._worker.is_alive()
+    assert service._retrieval_batcher._worker.is_alive()